@@ -1,7 +1,6 @@
 import os
 import logging
 import traceback
-import time  # <- (novo) para cache-busting do logo
 from datetime import datetime, timedelta, UTC
 from functools import wraps
 
@@ -15,7 +14,7 @@ import dash_mantine_components as dmc
 
 # ===== Núcleo (seu backend/JSON/repos/helpers) =====
 from core.backend import (
-    THEMES, read_settings, write_settings, ensure_dirs,
+    THEMES, read_settings, ensure_dirs,
     find_user_by_email, init_files, compute_stock_snapshot,
 )
 
@@ -34,6 +33,29 @@ init_files()
 server = Flask(__name__)
 server.secret_key = SECRET_KEY
 
+# JSON das rotas Flask (jsonify / retorno de dict) via orjson, quando instalado.
+# Os callbacks do Dash já serializam com o motor orjson do plotly; isto cobre o restante.
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            # só o formato compacto vai para o orjson; indent/opções extras ficam com o json padrão
+            if set(kwargs) - {"separators"} or kwargs.get("separators", (",", ":")) != (",", ":"):
+                return super().dumps(obj, **kwargs)
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME  # datas seguem o default do Flask
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode()
+            except TypeError:  # ex.: inteiro > 64 bits
+                return super().dumps(obj, **kwargs)
+
+    server.json = OrjsonJSONProvider(server)
+except ImportError:
+    pass
+
 # ===== Prefixos usados pelo Dash (mantenha em sincronia com Dash abaixo) =====
 APP_PREFIX = "/app"          # deve bater com requests_pathname_prefix/routes_pathname_prefix
 ASSETS_PREFIX = f"{APP_PREFIX}/assets"
@@ -178,10 +200,10 @@ def login():
 
     # Novo: resolve a URL do logo a partir das configurações (assets ou uploads)
     logo_url = resolve_logo_url(s)
-    # Cache-busting simples para refletir trocas de logo imediatamente
+    # Cache-busting pelo hash do conteúdo (gravado no upload): só muda quando o logo muda
     if logo_url:
         sep = "&" if "?" in logo_url else "?"
-        logo_url = f"{logo_url}{sep}v={int(time.time())}"
+        logo_url = f"{logo_url}{sep}v={s.get('logo_cache_key') or '0'}"
 
     err = None
     if request.method == "POST":
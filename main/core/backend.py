@@ -1,6 +1,7 @@
 # core/backend.py
 # core import
-import os, json, threading, re
+import os, sys, json, threading, re, queue, atexit, hashlib, logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
 
@@ -49,6 +50,9 @@ _stockmov_lock = threading.Lock()
 _estoque_lock = threading.Lock()
 
 # ================== Utilitários I/O ==================
+# Pool para leituras independentes de arquivos feitas em paralelo (ex.: KPIs da home)
+_IO_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="backend-io")
+
 def ensure_dirs():
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -62,6 +66,17 @@ def read_json(path, default):
     except Exception:
         return default
 
+def file_version(path):
+    """
+    Token barato de versão de um arquivo de dados: (mtime_ns, tamanho, inode), ou None se não existir.
+    Muda a cada write_json (o os.replace troca o inode), então serve de chave de cache.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
 def write_json(path, data, lock):
     tmp = path + ".tmp"
     with lock:
@@ -158,23 +173,76 @@ def init_files():
 init_files()
 
 # ================== Repositórios simples ==================
-def get_users(): return read_json(USERS_FILE, {"users":[]})["users"]
+def _page_desc(rows, limit, offset=0):
+    """Página da mais recente para a mais antiga sem inverter a lista inteira: só a página é copiada."""
+    end = max(0, len(rows) - max(0, int(offset or 0)))
+    return rows[max(0, end - int(limit)):end][::-1]
+
+# Cache em processo das listas pequenas e muito lidas (usuários/médicos/tipos de exame).
+# Validado pela versão do arquivo a cada chamada, então qualquer write_json (deste ou de outro
+# processo) invalida sozinho. Os getters devolvem cópia rasa da lista: os registros são
+# compartilhados com o cache e não devem ser alterados no lugar.
+_LIST_CACHE = {}
+
+def _cached_list(path, key):
+    v = file_version(path)
+    hit = _LIST_CACHE.get(path)
+    if v is not None and hit is not None and hit[0] == v:
+        return hit[1]
+    rows = read_json(path, {key:[]})[key]
+    _LIST_CACHE[path] = (v, rows)
+    return rows
+
+# Índice id -> registro por arquivo, refeito só quando a lista em cache muda (busca pontual em O(1))
+_ID_INDEX = {}
+
+def _id_index(path, key):
+    rows = _cached_list(path, key)
+    hit = _ID_INDEX.get(path)
+    if hit is None or hit[0] is not rows:
+        idx = {}
+        for r in rows:
+            idx.setdefault(r.get("id"), r)  # 1º com o id vence, como na busca linear
+        hit = _ID_INDEX[path] = (rows, idx)
+    return hit[1]
+
+def get_users(): return list(_cached_list(USERS_FILE, "users"))
+def get_user(uid): return _id_index(USERS_FILE, "users").get(uid)
 def save_users(users): write_json(USERS_FILE, {"users":users}, _users_lock)
+# Índice e-mail (minúsculo) -> usuário, refeito só quando a lista em cache muda
+_EMAIL_INDEX = (None, {})
+
+def _user_email_index():
+    global _EMAIL_INDEX
+    rows = _cached_list(USERS_FILE, "users")
+    src, idx = _EMAIL_INDEX
+    if src is not rows:
+        idx = {}
+        for u in rows:
+            idx.setdefault(sys.intern((u.get("email","") or "").lower()), u)  # 1º cadastrado vence, como na busca linear
+        _EMAIL_INDEX = (rows, idx)
+    return idx
+
 def find_user_by_email(email):
-    email = (email or "").strip().lower()
-    return next((u for u in get_users() if (u.get("email","") or "").lower()==email), None)
+    return _user_email_index().get((email or "").strip().lower())
+
+def get_user_email_set():
+    """E-mails (minúsculos) já cadastrados; para checagem de duplicidade em O(1)."""
+    return _user_email_index().keys()
 
-def list_exam_types(): return read_json(EXAMTYPES_FILE, {"exam_types":[]})["exam_types"]
+def list_exam_types(): return list(_cached_list(EXAMTYPES_FILE, "exam_types"))
+def get_exam_type(tid): return _id_index(EXAMTYPES_FILE, "exam_types").get(tid)
 def list_materials(): return read_json(MATERIALS_FILE, {"materials":[]})["materials"]
 def list_stock_movements(): return read_json(STOCK_MOV_FILE, {"movements":[]})["movements"]
 def list_exams(): return read_json(EXAMS_FILE, {"exams":[]})["exams"]
-def list_doctors(): return read_json(DOCTORS_FILE, {"doctors":[]})["doctors"]
+def list_doctors(): return list(_cached_list(DOCTORS_FILE, "doctors"))
+def get_doctor(did): return _id_index(DOCTORS_FILE, "doctors").get(did)
 def save_doctors(docs): write_json(DOCTORS_FILE, {"doctors":docs}, _doctors_lock)
 
 # ================== Agregações ==================
-def aggregate_exam_material_usage():
+def aggregate_exam_material_usage(exams=None):
     usage = {}
-    for e in list_exams():
+    for e in (list_exams() if exams is None else exams):
         for item in e.get("materiais_usados", []) or []:
             mid = item.get("material_id"); qty = float(item.get("quantidade") or 0)
             if mid: usage[mid] = usage.get(mid, 0.0) + qty
@@ -251,27 +319,34 @@ def compute_stock_snapshot():
     - 'estoque_atual' PRIORITÁRIO do estoque.json (soma de saldos por lotes).
     - Fallback para fórmula quando não há lotes cadastrados para o material.
     """
-    mats  = list_materials()
-    usage = aggregate_exam_material_usage()
-    moves = aggregate_manual_movements()
-    est   = _read_estoque()
-
+    return _build_stock_snapshot(list_materials(), aggregate_exam_material_usage(),
+                                 aggregate_manual_movements(), _read_estoque())
+
+_NO_MOVES = {"entrada":0.0,"saida":0.0,"ajuste":0.0}
+
+def _material_balance(m, usage, moves, est):
+    """(inicial, mínimo, movimentações, consumo em exames, saldo atual) de um material."""
+    mid = m["id"]
+    ini = float(m.get("estoque_inicial") or 0.0)
+    minimo = float(m.get("estoque_minimo") or 0.0)
+    mm = moves.get(mid, _NO_MOVES)
+    cons = float(usage.get(mid, 0.0))
+
+    # saldo atual: prefere estoque.json
+    if str(mid) in est and len(est[str(mid)] or []) > 0:
+        atual = _sum_batches(est, mid)
+    else:
+        # sem lotes: usa fórmula (compatibilidade com dados antigos)
+        atual = ini + mm["entrada"] - mm["saida"] + mm["ajuste"] - cons
+    return ini, minimo, mm, cons, float(atual)
+
+def _build_stock_snapshot(mats, usage, moves, est):
+    # contrato das linhas: valores numéricos sempre float e abaixo_minimo sempre bool
     snap = []
     for m in mats:
         mid = m["id"]
-        ini = float(m.get("estoque_inicial") or 0.0)
-        minimo = float(m.get("estoque_minimo") or 0.0)
-        mm = moves.get(mid, {"entrada":0.0,"saida":0.0,"ajuste":0.0})
-        cons = float(usage.get(mid, 0.0))
-
-        # saldo atual: prefere estoque.json
-        if str(mid) in est and len(est[str(mid)] or []) > 0:
-            atual = _sum_batches(est, mid)
-        else:
-            # sem lotes: usa fórmula (compatibilidade com dados antigos)
-            atual = ini + mm["entrada"] - mm["saida"] + mm["ajuste"] - cons
-
-        abaixo = atual < minimo if minimo > 0 else False
+        ini, minimo, mm, cons, atual = _material_balance(m, usage, moves, est)
+        abaixo = bool(minimo > 0 and atual < minimo)
         snap.append({
             "id": mid, "nome": m.get("nome"), "tipo": m.get("tipo"), "unidade": m.get("unidade"),
             "valor_unitario": float(m.get("valor_unitario") or 0.0),
@@ -282,6 +357,67 @@ def compute_stock_snapshot():
     snap.sort(key=lambda x: (x["nome"] or "").lower())
     return snap
 
+def _build_stock_columns(mats, usage, moves, est):
+    import numpy as np
+    atual, valor, abaixo = [], [], []
+    for m in mats:
+        _, minimo, _, _, a = _material_balance(m, usage, moves, est)
+        atual.append(a)
+        valor.append(float(m.get("valor_unitario") or 0.0))
+        abaixo.append(minimo > 0 and a < minimo)
+    return {
+        "estoque_atual": np.array(atual, dtype=np.float64),
+        "valor_unitario": np.array(valor, dtype=np.float64),
+        "abaixo_minimo": np.array(abaixo, dtype=np.bool_),
+    }
+
+def compute_stock_snapshot_columns(exams=None):
+    """
+    Mesmo cálculo de compute_stock_snapshot, mas em colunas (arrays NumPy, na ordem de materials.json)
+    só com o que os agregados usam: estoque_atual, valor_unitario, abaixo_minimo.
+    As telas que listam linhas continuam usando compute_stock_snapshot.
+    `exams` permite reaproveitar uma lista de exames já lida (evita reler exams.json).
+    """
+    # arquivos independentes: materiais/movimentações/lotes são lidos em paralelo
+    # enquanto o consumo por material é agregado a partir dos exames nesta thread
+    f_mats = _IO_POOL.submit(list_materials)
+    f_moves = _IO_POOL.submit(aggregate_manual_movements)
+    f_est = _IO_POOL.submit(_read_estoque)
+    usage = aggregate_exam_material_usage(exams)
+    return _build_stock_columns(f_mats.result(), usage, f_moves.result(), f_est.result())
+
+def _iso_day(prefix):
+    # só no caminho de dados legados com data fora do padrão: inválida vira NaT (nunca é "hoje")
+    import numpy as np
+    try:
+        return np.datetime64(prefix, "D")
+    except ValueError:
+        return np.datetime64("NaT", "D")
+
+def compute_home_kpis():
+    """
+    KPIs da página inicial numa passada: (total de exames, exames de hoje,
+    materiais abaixo do mínimo, valor do estoque). exams.json é lido uma única vez.
+    """
+    import numpy as np  # só quando os KPIs são calculados
+    from core.kernels import kpi_scan
+
+    exams = list_exams()
+    cols = compute_stock_snapshot_columns(exams)  # lê os demais arquivos em paralelo
+    # data_hora é ISO: o prefixo YYYY-MM-DD vira dia desde a época numa conversão só do NumPy
+    # (registros legados gravados antes de _coerce_exam podem trazer número: vira texto e cai no NaT)
+    prefixes = [dh[:10] if isinstance(dh, str) else ("" if dh is None else str(dh)[:10])
+                for dh in [e.get("data_hora") for e in exams]]
+    try:
+        days = np.array(prefixes, dtype="datetime64[D]")
+    except ValueError:
+        days = np.array([_iso_day(p) for p in prefixes], dtype="datetime64[D]")
+    today = int(np.datetime64(datetime.now().date(), "D").astype(np.int64))
+
+    stock_value, low, today_count = kpi_scan(cols["estoque_atual"], cols["valor_unitario"],
+                                             cols["abaixo_minimo"], days.view(np.int64), today)
+    return len(exams), today_count, low, stock_value
+
 def format_dt_br(iso_str):
     try: 
         return datetime.fromisoformat(iso_str).strftime("%d/%m/%Y %H:%M")
@@ -336,9 +472,18 @@ def preview_exam_cost(items: list) -> dict:
     return {"total": tot, "itens": its}
 
 # ================== Exames ==================
+def _coerce_exam(exam: dict) -> dict:
+    """Tipos garantidos na gravação: data_hora é str ISO ou None (leitores comparam prefixo sem try)."""
+    dh = exam.get("data_hora")
+    if dh is not None and not isinstance(dh, str):
+        exam = exam.copy()
+        exam["data_hora"] = dh.isoformat() if hasattr(dh, "isoformat") else str(dh)
+    return exam
+
 def add_or_update_exam(exam: dict):
     data = read_json(EXAMS_FILE, {"exams":[]})
     exams = data["exams"]
+    exam = _coerce_exam(exam)
 
     # UPDATE simples (não mexe em estoque)
     if exam.get("id"):
@@ -395,15 +540,70 @@ def doctor_names():
     return names
 
 # ================== Logs / Validations / CRUDs Gerenciais ==================
-def list_logs():
-    return read_json(LOGS_FILE, {"logs":[]})["logs"]
+def list_logs_page(limit, offset=0):
+    """Uma página de logs (mais recentes primeiro) + total de registros (para a paginação no servidor)."""
+    flush_logs()
+    rows = read_json(LOGS_FILE, {"logs":[]})["logs"]
+    return _page_desc(rows, limit, offset), len(rows)
 
 def save_logs(rows):
     write_json(LOGS_FILE, {"logs":rows}, _logs_lock)
 
+# Auditoria: log_action só enfileira; uma thread escritora grava os lotes pendentes
+# numa única leitura+escrita do arquivo. Cada registro encadeia o hash do anterior
+# (prev_hash/hash), de modo que a gravação assíncrona não perde a evidência de ordem.
+_LOG_Q = queue.Queue()
+_LOG_BATCH_MAX = 100
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+def _log_hash(prev_hash, entry):
+    payload = json.dumps(entry, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b((prev_hash + payload).encode("utf-8"), digest_size=16).hexdigest()
+
+def _write_log_batch(batch):
+    rows = read_json(LOGS_FILE, {"logs":[]})["logs"]
+    prev = (rows[-1].get("hash") if rows else None) or ""
+    for entry in batch:
+        entry["prev_hash"] = prev
+        entry["hash"] = prev = _log_hash(prev, entry)
+        rows.append(entry)
+    save_logs(rows)
+
+def _log_writer_loop():
+    while True:
+        batch = [_LOG_Q.get()]
+        while len(batch) < _LOG_BATCH_MAX:
+            try:
+                batch.append(_LOG_Q.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_log_batch(batch)
+        except Exception:
+            logging.getLogger(__name__).exception("[log_action] falha ao gravar %d log(s)", len(batch))
+        finally:
+            for _ in batch:
+                _LOG_Q.task_done()
+
+def _ensure_log_writer():
+    global _log_writer
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None:
+                _log_writer = threading.Thread(target=_log_writer_loop, name="audit-log-writer", daemon=True)
+                _log_writer.start()
+
+def flush_logs():
+    """Bloqueia até os logs enfileirados estarem no arquivo (leitura consistente após gravação)."""
+    if _log_writer is not None:
+        _LOG_Q.join()
+
+atexit.register(flush_logs)
+
 def log_action(user_email, action, entity, entity_id, before=None, after=None):
-    rows = list_logs()
-    rows.append({
+    _ensure_log_writer()
+    _LOG_Q.put({
         "ts": datetime.utcnow().isoformat(),
         "user": user_email,
         "action": action,           # create|update|delete
@@ -412,7 +612,6 @@ def log_action(user_email, action, entity, entity_id, before=None, after=None):
         "before": before,
         "after": after,
     })
-    save_logs(rows)
 
 def validate_text_input(value, label):
     val = (value or "").strip()
@@ -457,7 +656,6 @@ def update_user(uid, fields):
     ok = False
     for i,u in enumerate(users):
         if u.get("id")==uid:
-            before = users[i].copy()
             users[i].update(fields or {})
             ok = True
             break
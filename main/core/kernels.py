@@ -0,0 +1,41 @@
+# core/kernels.py
+# Reduções numéricas dos KPIs sobre arrays contíguos.
+# Compiladas com numba quando disponível; senão, as mesmas operações em NumPy.
+# Com numba, a assinatura explícita faz a compilação acontecer no import deste módulo
+# (e não na primeira chamada); com cache=True, só a 1ª execução na máquina compila de
+# fato (alguns segundos) — as seguintes carregam o binário do __pycache__.
+# A página inicial importa este módulo numa thread à parte na subida da aplicação.
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit("(float64[:], float64[:], boolean[:], int64[:], int64)", cache=True, nogil=True)
+    def _kpi_scan(est, val, flags, days, today):
+        s = 0.0
+        low = 0
+        for i in range(est.shape[0]):
+            s += est[i] * val[i]
+            if flags[i]:
+                low += 1
+        hoje = 0
+        for i in range(days.shape[0]):
+            if days[i] == today:
+                hoje += 1
+        return s, low, hoje
+else:
+    _kpi_scan = None
+
+def kpi_scan(est, val, flags, days, today):
+    """
+    Todos os KPIs numéricos numa única chamada: (Σ estoque×valor, nº abaixo do mínimo, nº de exames hoje).
+    est/val: float64 e flags: bool (uma posição por material);
+    days: int64 com o dia (desde a época) de cada exame, NaT/inválido como qualquer valor != today.
+    """
+    if _kpi_scan is not None:
+        s, low, hoje = _kpi_scan(est, val, flags, days, today)
+        return float(s), int(low), int(hoje)
+    return float(np.dot(est, val)), int(np.count_nonzero(flags)), int(np.count_nonzero(days == today))
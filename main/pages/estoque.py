@@ -1,5 +1,4 @@
 # pages/estoque.py — gestão de estoque consolidada (lotes/validade + SALDO INICIAL correto)
-import json
 import dash
 from dash import html, dcc, Input, Output, State, ALL, no_update, ctx
 import dash_bootstrap_components as dbc
@@ -2,27 +2,127 @@
 import io
 import os
 import csv
+import codecs
+import hashlib
+import shutil
 import zipfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Iterable, List, Dict, Any
+from functools import wraps
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+try:  # decoder em C direto de bytes, quando disponível
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
 
 import dash
-from dash import html, dcc, get_app
+from dash import html, get_app
 import dash_bootstrap_components as dbc
-from flask import Response, request, send_file
+from flask import Response, request, send_file, stream_with_context
+from werkzeug.wsgi import FileWrapper
 
 # ===== Backend: usa os mesmos arquivos/funções do app =====
 from core.backend import (
-    read_json,
     DATA_DIR,
     MATERIALS_FILE, EXAMS_FILE, DOCTORS_FILE, EXAMTYPES_FILE,
     LOGS_FILE, SETTINGS_FILE, USERS_FILE, STOCK_MOV_FILE, ESTOQUE_FILE,
+    flush_logs,
 )
 
 dash.register_page(__name__, path="/exportar", name="Exportar")
 
-# Flag interna para evitar duplicação de rotas em hot-reload
-_ROUTES_REGISTERED = False
+# Chave em server.extensions que marca as rotas de exportação como registradas
+_ROUTES_FLAG = "am_export_routes"
+
+# ZIP montado em arquivo temporário "spooled": fica em memória até 32 MB, depois vai para disco
+_ZIP_SPOOL_MAX = 32 << 20
+_ZIP_WRITE_BUFFER = 128 * 1024
+# Linhas por bloco enviado nas respostas CSV em streaming
+_CSV_STREAM_BATCH = 1000
+
+NOTIFICATIONS_FILE = os.path.join(DATA_DIR, "notifications.json")
+
+# Cache em processo dos JSONs lidos pelas exportações: path -> (mtime_ns, dados)
+_JSON_CACHE: Dict[str, tuple[int, Any]] = {}
+
+
+def _read_json_fast(path: str, default: Any) -> Any:
+    """Mesma semântica de read_json, mas lendo bytes e usando orjson se instalado."""
+    try:
+        with open(path, "rb") as f:
+            return _loads(f.read())
+    except Exception:
+        return default
+
+
+def _cached_read_json(path: str, default: Any) -> Any:
+    """read_json com cache invalidado pelo mtime do arquivo (somente leitura!)."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return default
+    entry = _JSON_CACHE.get(path)
+    if entry and entry[0] == mtime:
+        return entry[1]
+    data = _read_json_fast(path, default)
+    _JSON_CACHE[path] = (mtime, data)
+    return data
+
+
+# Leitura concorrente dos JSONs do all.zip (o I/O de arquivo libera o GIL)
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="export-json")
+
+
+def _prefetch_json(sources: Iterable[tuple[str, Any]]) -> None:
+    """Aquece o _JSON_CACHE em paralelo; os _rows_* depois só consultam o cache."""
+    list(_PREFETCH_POOL.map(lambda src: _cached_read_json(*src), sources))
+
+
+# =============== GET condicional (ETag / Last-Modified) ===============
+def _export_etag(paths: Iterable[str]) -> tuple[str, float]:
+    """ETag = hash(rota + query + mtime/tamanho dos JSONs de origem); também devolve o maior mtime."""
+    h = hashlib.blake2b(request.full_path.encode("utf-8"), digest_size=16)
+    last = 0.0
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            h.update(b"|-")
+            continue
+        h.update(f"|{st.st_mtime_ns}:{st.st_size}".encode())
+        last = max(last, st.st_mtime)
+    return h.hexdigest(), last
+
+
+def _conditional(*paths: str):
+    """Responde 304 sem regenerar o arquivo quando If-None-Match bate com os JSONs atuais."""
+    has_logs = LOGS_FILE in paths
+    def deco(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if has_logs:
+                flush_logs()  # logs ainda na fila do gravador entram no arquivo antes do ETag e da leitura
+            etag, last = _export_etag(paths)
+            if etag in request.if_none_match:
+                resp = Response(status=304)
+            else:
+                resp = view(*args, **kwargs)
+            resp.set_etag(etag)
+            if last:
+                resp.last_modified = last
+            resp.cache_control.no_cache = True  # sempre revalida; nunca serve export velho do cache
+            if resp.status_code == 200 and resp.accept_ranges and resp.content_length:
+                # Range/If-Range (retomar download) precisa do ETag já definido
+                resp.make_conditional(request, accept_ranges=resp.accept_ranges,
+                                      complete_length=resp.content_length)
+            return resp
+        return wrapper
+    return deco
 
 
 # =============== Helpers de data/CSV ===============
@@ -39,299 +139,347 @@ def _parse_dt(s: str | None) -> datetime | None:
         return None
 
 
-def _csv_response(filename: str, rows: Iterable[Dict[str, Any]], headers: List[str]) -> Response:
-    """Gera CSV com BOM (para Excel) e separador configurável via ?sep=;"""
-    sep = request.args.get("sep", ",")
+def _date_window() -> tuple[str | None, str | None]:
+    """
+    Lê ?from/?to uma única vez e devolve os limites como texto ISO 'YYYY-MM-DDTHH:MM:SS'
+    ('to' já no fim do dia): timestamps ISO são comparáveis lexicograficamente.
+    """
+    dt_from = _parse_dt(request.args.get("from"))
+    dt_to = _parse_dt(request.args.get("to"))
+    from_s = dt_from.isoformat(timespec="seconds")[:19] if dt_from else None
+    to_s = dt_to.replace(hour=23, minute=59, second=59).isoformat(timespec="seconds")[:19] if dt_to else None
+    return from_s, to_s
+
+
+def _in_window(ts: str | None, from_s: str | None, to_s: str | None) -> bool:
+    if not from_s and not to_s:
+        return True
+    if not ts or not isinstance(ts, str):
+        return False
+    if len(ts) >= 19 and ts[13] == ":" and ts[16] == ":":
+        # layout canônico: separador vira 'T' ('2025-01-01 10:00:00' também vale) e corta fração/fuso
+        key = ts[:10] + "T" + ts[11:19]
+    elif len(ts) == 10:
+        key = ts + "T00:00:00"  # data pura vira meia-noite
+    else:
+        dt = _parse_dt(ts)  # formatos fora do padrão (sem segundos etc.)
+        if dt is None:
+            return False
+        key = dt.isoformat(timespec="seconds")[:19]
+    return (not from_s or key >= from_s) and (not to_s or key <= to_s)
+
+
+def _fast_lines(batch: List[Sequence[Any]], sep: str, ncols: int) -> str | None:
+    """
+    Formata um bloco de linhas sem passar pelo csv.writer (str() direto, None vira vazio).
+    Devolve None quando alguma célula precisaria de aspas (separador, aspas ou quebra de linha),
+    e aí o chamador usa o csv.writer para o bloco inteiro. A checagem é feita por contagem no texto.
+    """
+    if not batch:
+        return ""
+    text = "\n".join([sep.join(["" if v is None else str(v) for v in r]) for r in batch]) + "\n"
+    if ('"' in text or "\r" in text
+            or text.count("\n") != len(batch)
+            or text.count(sep) != len(batch) * (ncols - 1)):
+        return None
+    return text
+
+
+def _iter_csv(rows: Iterable[Sequence[Any]], headers: List[str], sep: str, fast: bool = False) -> Iterator[bytes]:
+    """
+    Gera o CSV em blocos de bytes. O StringIO é reaproveitado entre blocos (seek/truncate)
+    e o encoder incremental mantém estado, então o BOM sai só no primeiro bloco.
+    Com `fast`, blocos sem células "perigosas" são formatados direto (ver _fast_lines).
+    """
     buf = io.StringIO()
-    writer = csv.writer(buf, delimiter=sep, lineterminator="\n")
-    writer.writerow(headers)
-    for r in rows:
-        writer.writerow([r.get(h, "") if r.get(h) is not None else "" for h in headers])
-    data = buf.getvalue().encode("utf-8-sig")
+    w = csv.writer(buf, delimiter=sep, lineterminator="\n")
+    encode = codecs.getincrementalencoder("utf-8-sig")().encode
+    w.writerow(headers)
+    yield encode(buf.getvalue())
+    buf.seek(0)
+    buf.truncate()
+    ncols = len(headers)
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, _CSV_STREAM_BATCH))
+        chunk = _fast_lines(batch, sep, ncols) if fast else None
+        if chunk is None:
+            w.writerows(batch)
+            chunk = buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if chunk:
+            yield encode(chunk)
+        if len(batch) < _CSV_STREAM_BATCH:
+            break
+
+
+def _csv_response(filename: str, rows: Iterable[Sequence[Any]], headers: List[str], fast: bool = False) -> Response:
+    """
+    Gera CSV com BOM (para Excel) e separador configurável via ?sep=;
+    `rows` já vem na ordem de `headers` (None vira célula vazia no csv.writer).
+    A resposta é enviada em streaming; as linhas são produzidas dentro do contexto do request.
+    `fast` liga a formatação direta para datasets quase só numéricos.
+    """
+    sep = request.args.get("sep", ",")
     return Response(
-        data,
+        stream_with_context(_iter_csv(rows, headers, sep, fast)),
         mimetype="text/csv; charset=utf-8",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
-def _zip_response(filename: str, files: Dict[str, bytes]) -> Response:
-    bio = io.BytesIO()
-    with zipfile.ZipFile(bio, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for path, content in files.items():
-            zf.writestr(path, content)
-    bio.seek(0)
-    return send_file(
-        bio,
-        mimetype="application/zip",
-        as_attachment=True,
-        download_name=filename
-    )
-
-
-def _bytes_csv(rows: List[Dict[str, Any]], headers: List[str], sep: str = ",") -> bytes:
-    sio = io.StringIO()
-    w = csv.writer(sio, delimiter=sep, lineterminator="\n")
+def _write_csv(dst: IO[bytes], rows: Iterable[Sequence[Any]], headers: List[str], sep: str = ",",
+               fast: bool = False) -> None:
+    """
+    Escreve o CSV (com BOM) direto num stream binário, sem montar o arquivo inteiro em memória.
+    Um BufferedWriter de 128 KB fica entre o texto e o zip, para o DEFLATE receber blocos grandes.
+    """
+    buffered = io.BufferedWriter(dst, buffer_size=_ZIP_WRITE_BUFFER)
+    text = io.TextIOWrapper(buffered, encoding="utf-8-sig", newline="")
+    w = csv.writer(text, delimiter=sep, lineterminator="\n")
     w.writerow(headers)
-    for r in rows:
-        w.writerow([r.get(h, "") if r.get(h) is not None else "" for h in headers])
-    return sio.getvalue().encode("utf-8-sig")
+    if fast:
+        ncols = len(headers)
+        it = iter(rows)
+        while True:
+            batch = list(islice(it, _CSV_STREAM_BATCH))
+            chunk = _fast_lines(batch, sep, ncols)
+            if chunk is None:
+                w.writerows(batch)
+            else:
+                text.write(chunk)
+            if len(batch) < _CSV_STREAM_BATCH:
+                break
+    else:
+        w.writerows(rows)
+    text.detach()      # flush do texto; o dono do stream (zip) é quem fecha
+    buffered.detach()  # flush do buffer binário
+
+
+def _csv_member(rows_fn: Callable[[], Iterable[Sequence[Any]]], headers: List[str], sep: str,
+                fast: bool = False) -> Callable[[IO[bytes]], None]:
+    """Entrada de ZIP que só gera as linhas no momento de escrever."""
+    return lambda dst: _write_csv(dst, rows_fn(), headers, sep, fast)
+
+
+def _file_member(path: str) -> Callable[[IO[bytes]], None]:
+    """Entrada de ZIP copiada do arquivo em blocos de 128 KB (sem ler o arquivo inteiro)."""
+    def write(dst: IO[bytes]) -> None:
+        with open(path, "rb") as src:
+            shutil.copyfileobj(src, dst, length=_ZIP_WRITE_BUFFER)
+    return write
+
+
+def _zip_compression(arg: str | None) -> tuple[int, int | None]:
+    if arg == "0":
+        return zipfile.ZIP_STORED, None
+    if arg and len(arg) == 1 and arg in "123456789":
+        return zipfile.ZIP_DEFLATED, int(arg)
+    return zipfile.ZIP_DEFLATED, 1
+
+
+def _zip_response(filename: str, members: Iterable[tuple[str, Callable[[IO[bytes]], None]]]) -> Response:
+    """
+    Monta o ZIP escrevendo cada entrada em streaming (zf.open(..., "w")).
+    Compressão via ?compress=0..9 (padrão 1: CSV comprime bem já no nível mais barato do zlib;
+    0 = ZIP_STORED, útil quando o proxy já aplica gzip).
+    """
+    compression, level = _zip_compression(request.args.get("compress"))
+    tmp = tempfile.SpooledTemporaryFile(max_size=_ZIP_SPOOL_MAX)
+    with zipfile.ZipFile(tmp, mode="w", compression=compression, compresslevel=level) as zf:
+        for path, write in members:
+            with zf.open(path, mode="w", force_zip64=True) as dst:
+                write(dst)
+    tmp.seek(0, io.SEEK_END)
+    size = tmp.tell()
+    tmp.seek(0)
+    # Response manual: send_file só informa tamanho (e aceita Range) para caminho/BytesIO.
+    # O FileWrapper do Werkzeug é "seekable", então um 206 lê só o trecho pedido.
+    resp = Response(FileWrapper(tmp, _ZIP_WRITE_BUFFER), mimetype="application/zip", direct_passthrough=True)
+    resp.content_length = size
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp.accept_ranges = "bytes"  # o Range é aplicado em _conditional, depois de ETag/Last-Modified
+    return resp
 
 
 # =============== Normalizadores por dataset ===============
-def _rows_materials() -> List[Dict[str, Any]]:
-    mats = read_json(MATERIALS_FILE, {"materials": []})["materials"]
-    out = []
-    for m in mats:
-        out.append({
-            "id": m.get("id"),
-            "nome": m.get("nome"),
-            "tipo": m.get("tipo"),
-            "unidade": m.get("unidade"),
-            "valor_unitario": m.get("valor_unitario"),
-            "estoque_inicial": m.get("estoque_inicial"),
-            "estoque_minimo": m.get("estoque_minimo"),
-        })
-    return out
-
-
-def _rows_estoque() -> List[Dict[str, Any]]:
+# Cada _rows_* gera tuplas já na ordem do respectivo *_HEADERS (o CSV não precisa de dicts).
+Row = tuple
+
+MATERIALS_HEADERS = ["id", "nome", "tipo", "unidade", "valor_unitario", "estoque_inicial", "estoque_minimo"]
+ESTOQUE_HEADERS = ["material_id", "lote_id", "lote", "validade", "saldo"]
+STOCK_MOV_HEADERS = ["id", "material_id", "tipo", "quantidade", "lote", "validade", "valor_unitario", "obs", "ts"]
+EXAMS_HEADERS = ["id", "exam_id", "modalidade", "exame", "medico", "data_hora", "idade", "user_email", "custo_estimado_total"]
+EXAM_ITEMS_HEADERS = ["exam_id", "exam_code", "material_id", "lote_id", "quantidade", "valor_unitario", "subtotal"]
+EXAMTYPES_HEADERS = ["id", "modalidade", "nome", "codigo"]
+DOCTORS_HEADERS = ["id", "nome"]
+USERS_HEADERS = ["id", "nome", "email", "modalidades_permitidas", "perfil"]
+LOGS_HEADERS = ["ts", "user", "action", "entity", "entity_id"]
+NOTIFICATIONS_HEADERS = ["id", "ts", "type", "title", "message", "user"]
+
+
+def _projector(*keys: str) -> Callable[[Dict[str, Any]], Row]:
+    """Projeção dict -> tupla na ordem de `keys` (chave ausente vira None), montada uma vez por dataset."""
+    return lambda d: tuple(map(d.get, keys))
+
+
+_proj_material = _projector(*MATERIALS_HEADERS)
+_proj_batch = _projector("id", "lote", "validade", "saldo")
+_proj_stock_mov = _projector(*STOCK_MOV_HEADERS)
+_proj_exam = _projector(*EXAMS_HEADERS)
+_proj_exam_item = _projector("material_id", "lote_id", "quantidade", "valor_unitario", "subtotal")
+_proj_exam_type = _projector(*EXAMTYPES_HEADERS)
+_proj_doctor = _projector(*DOCTORS_HEADERS)
+_proj_user = _projector(*USERS_HEADERS)
+_proj_log = _projector(*LOGS_HEADERS)
+
+
+def _rows_materials() -> Iterator[Row]:
+    return map(_proj_material, _cached_read_json(MATERIALS_FILE, {"materials": []})["materials"])
+
+
+def _rows_estoque() -> Iterator[Row]:
     """
     Flattens estoque.json:
       {"<material_id>":[{"id":int,"lote":str,"validade":str,"saldo":float},...]}
     -> linhas: material_id, lote_id, lote, validade, saldo
     """
-    est = read_json(ESTOQUE_FILE, {})
-    out = []
+    est = _cached_read_json(ESTOQUE_FILE, {})
     for k, lst in (est or {}).items():
         try:
-            mid = int(k)
+            mid = (int(k),)
         except Exception:
             continue
         for b in lst or []:
-            out.append({
-                "material_id": mid,
-                "lote_id": b.get("id"),
-                "lote": b.get("lote"),
-                "validade": b.get("validade"),
-                "saldo": b.get("saldo"),
-            })
-    return out
-
-
-def _rows_stock_movements() -> List[Dict[str, Any]]:
-    rows = read_json(STOCK_MOV_FILE, {"movements": []})["movements"]
-    # Filtros por ?from & ?to no campo ts
-    dt_from = _parse_dt(request.args.get("from"))
-    dt_to = _parse_dt(request.args.get("to"))
-    out = []
+            yield mid + _proj_batch(b)
+
+
+def _rows_stock_movements() -> Iterator[Row]:
+    rows = _cached_read_json(STOCK_MOV_FILE, {"movements": []})["movements"]
+    # Filtros por ?from & ?to no campo ts (comparação direta de texto ISO)
+    from_s, to_s = _date_window()
     for m in rows:
-        ts = m.get("ts")
-        ok = True
-        if dt_from:
-            try:
-                ok = ok and (datetime.fromisoformat((ts or "").replace("Z", "")) >= dt_from)
-            except Exception:
-                ok = False
-        if dt_to:
-            try:
-                ok = ok and (datetime.fromisoformat((ts or "").replace("Z", "")) <= dt_to.replace(hour=23, minute=59, second=59))
-            except Exception:
-                ok = False
-        if ok:
-            out.append({
-                "id": m.get("id"),
-                "material_id": m.get("material_id"),
-                "tipo": m.get("tipo"),
-                "quantidade": m.get("quantidade"),
-                "lote": m.get("lote"),
-                "validade": m.get("validade"),
-                "valor_unitario": m.get("valor_unitario"),
-                "obs": m.get("obs"),
-                "ts": ts,
-            })
-    return out
-
-
-def _rows_exams() -> List[Dict[str, Any]]:
-    rows = read_json(EXAMS_FILE, {"exams": []})["exams"]
-    dt_from = _parse_dt(request.args.get("from"))
-    dt_to = _parse_dt(request.args.get("to"))
-    out = []
+        if _in_window(m.get("ts"), from_s, to_s):
+            yield _proj_stock_mov(m)
+
+
+def _exam_item_rows(e: Dict[str, Any]) -> Iterator[Row]:
+    prefix = (e.get("id"), e.get("exam_id"))
+    for it in (e.get("materiais_usados") or []):
+        yield prefix + _proj_exam_item(it)
+
+
+def _rows_exams() -> Iterator[Row]:
+    rows = _cached_read_json(EXAMS_FILE, {"exams": []})["exams"]
+    from_s, to_s = _date_window()
     for e in rows:
-        dh = e.get("data_hora")
-        ok = True
-        if dt_from:
-            try:
-                ok = ok and (datetime.fromisoformat((dh or "").replace("Z", "")) >= dt_from)
-            except Exception:
-                ok = False
-        if dt_to:
-            try:
-                ok = ok and (datetime.fromisoformat((dh or "").replace("Z", "")) <= dt_to.replace(hour=23, minute=59, second=59))
-            except Exception:
-                ok = False
-        if ok:
-            out.append({
-                "id": e.get("id"),
-                "exam_id": e.get("exam_id"),
-                "modalidade": e.get("modalidade"),
-                "exame": e.get("exame"),
-                "medico": e.get("medico"),
-                "data_hora": dh,
-                "idade": e.get("idade"),
-                "user_email": e.get("user_email"),
-                "custo_estimado_total": e.get("custo_estimado_total"),
-            })
-    return out
-
-
-def _rows_exam_items() -> List[Dict[str, Any]]:
-    rows = read_json(EXAMS_FILE, {"exams": []})["exams"]
-    dt_from = _parse_dt(request.args.get("from"))
-    dt_to = _parse_dt(request.args.get("to"))
-    out = []
+        if _in_window(e.get("data_hora"), from_s, to_s):
+            yield _proj_exam(e)
+
+
+def _rows_exam_items() -> Iterator[Row]:
+    rows = _cached_read_json(EXAMS_FILE, {"exams": []})["exams"]
+    from_s, to_s = _date_window()
     for e in rows:
-        dh = e.get("data_hora")
-        ok_ex = True
-        if dt_from:
-            try:
-                ok_ex = ok_ex and (datetime.fromisoformat((dh or "").replace("Z", "")) >= dt_from)
-            except Exception:
-                ok_ex = False
-        if dt_to:
-            try:
-                ok_ex = ok_ex and (datetime.fromisoformat((dh or "").replace("Z", "")) <= dt_to.replace(hour=23, minute=59, second=59))
-            except Exception:
-                ok_ex = False
-        if not ok_ex:
-            continue
-        for it in (e.get("materiais_usados") or []):
-            out.append({
-                "exam_id": e.get("id"),
-                "exam_code": e.get("exam_id"),
-                "material_id": it.get("material_id"),
-                "lote_id": it.get("lote_id"),
-                "quantidade": it.get("quantidade"),
-                "valor_unitario": it.get("valor_unitario"),
-                "subtotal": it.get("subtotal"),
-            })
-    return out
-
-
-def _rows_exam_types() -> List[Dict[str, Any]]:
-    rows = read_json(EXAMTYPES_FILE, {"exam_types": []})["exam_types"]
-    return [{"id": r.get("id"), "modalidade": r.get("modalidade"), "nome": r.get("nome"), "codigo": r.get("codigo")} for r in rows]
-
-
-def _rows_doctors() -> List[Dict[str, Any]]:
-    rows = read_json(DOCTORS_FILE, {"doctors": []})["doctors"]
-    return [{"id": r.get("id"), "nome": r.get("nome")} for r in rows]
-
-
-def _rows_users() -> List[Dict[str, Any]]:
-    rows = read_json(USERS_FILE, {"users": []})["users"]
-    out = []
-    for u in rows:
-        out.append({
-            "id": u.get("id"),
-            "nome": u.get("nome"),
-            "email": u.get("email"),
-            "modalidades_permitidas": u.get("modalidades_permitidas"),
-            "perfil": u.get("perfil"),
-        })
-    return out
-
-
-def _rows_logs() -> List[Dict[str, Any]]:
-    rows = read_json(LOGS_FILE, {"logs": []})["logs"]
-    return [{
-        "ts": r.get("ts"),
-        "user": r.get("user"),
-        "action": r.get("action"),
-        "entity": r.get("entity"),
-        "entity_id": r.get("entity_id"),
-    } for r in rows]
+        if _in_window(e.get("data_hora"), from_s, to_s):
+            yield from _exam_item_rows(e)
+
+
+def _rows_exams_and_items() -> tuple[List[Row], List[Row]]:
+    """Uma única passada em exams.json (e um único filtro de data) para exams.csv + exam_items.csv."""
+    rows = _cached_read_json(EXAMS_FILE, {"exams": []})["exams"]
+    from_s, to_s = _date_window()
+    exams_out, items_out = [], []
+    for e in rows:
+        if _in_window(e.get("data_hora"), from_s, to_s):
+            exams_out.append(_proj_exam(e))
+            items_out.extend(_exam_item_rows(e))
+    return exams_out, items_out
+
+
+def _rows_exam_types() -> Iterator[Row]:
+    return map(_proj_exam_type, _cached_read_json(EXAMTYPES_FILE, {"exam_types": []})["exam_types"])
+
+
+def _rows_doctors() -> Iterator[Row]:
+    return map(_proj_doctor, _cached_read_json(DOCTORS_FILE, {"doctors": []})["doctors"])
+
+
+def _rows_users() -> Iterator[Row]:
+    return map(_proj_user, _cached_read_json(USERS_FILE, {"users": []})["users"])
+
+
+def _rows_logs() -> Iterator[Row]:
+    return map(_proj_log, _cached_read_json(LOGS_FILE, {"logs": []})["logs"])
 
 
 # =============== Rotas Flask (registradas no import do módulo) ===============
 def _ensure_routes():
-    global _ROUTES_REGISTERED
-    if _ROUTES_REGISTERED:
-        return
-    app = get_app()
-    server = app.server
-    if getattr(server, "_export_routes_registered", False):
-        _ROUTES_REGISTERED = True
+    # Fonte única da verdade: o próprio app Flask. Um servidor recriado no hot-reload
+    # começa sem a marca e recebe as rotas; um re-import do módulo não duplica.
+    server = get_app().server
+    if server.extensions.get(_ROUTES_FLAG):
         return
 
     @server.route("/export/materials.csv")
+    @_conditional(MATERIALS_FILE)
     def export_materials():
-        rows = _rows_materials()
-        headers = ["id", "nome", "tipo", "unidade", "valor_unitario", "estoque_inicial", "estoque_minimo"]
-        return _csv_response("materials.csv", rows, headers)
+        return _csv_response("materials.csv", _rows_materials(), MATERIALS_HEADERS, fast=True)
 
     @server.route("/export/estoque.csv")
     @server.route("/export_estoque.csv")  # compat com link antigo
+    @_conditional(ESTOQUE_FILE)
     def export_estoque():
-        rows = _rows_estoque()
-        headers = ["material_id", "lote_id", "lote", "validade", "saldo"]
-        return _csv_response("estoque.csv", rows, headers)
+        return _csv_response("estoque.csv", _rows_estoque(), ESTOQUE_HEADERS, fast=True)
 
     @server.route("/export/stock_movements.csv")
+    @_conditional(STOCK_MOV_FILE)
     def export_stock_mov():
-        rows = _rows_stock_movements()
-        headers = ["id", "material_id", "tipo", "quantidade", "lote", "validade", "valor_unitario", "obs", "ts"]
-        return _csv_response("stock_movements.csv", rows, headers)
+        return _csv_response("stock_movements.csv", _rows_stock_movements(), STOCK_MOV_HEADERS)
 
     @server.route("/export/exams.csv")
+    @_conditional(EXAMS_FILE)
     def export_exams():
-        rows = _rows_exams()
-        headers = ["id", "exam_id", "modalidade", "exame", "medico", "data_hora", "idade", "user_email", "custo_estimado_total"]
-        return _csv_response("exams.csv", rows, headers)
+        return _csv_response("exams.csv", _rows_exams(), EXAMS_HEADERS)
 
     @server.route("/export/exam_items.csv")
+    @_conditional(EXAMS_FILE)
     def export_exam_items():
-        rows = _rows_exam_items()
-        headers = ["exam_id", "exam_code", "material_id", "lote_id", "quantidade", "valor_unitario", "subtotal"]
-        return _csv_response("exam_items.csv", rows, headers)
+        return _csv_response("exam_items.csv", _rows_exam_items(), EXAM_ITEMS_HEADERS, fast=True)
 
     @server.route("/export/exam_types.csv")
+    @_conditional(EXAMTYPES_FILE)
     def export_examtypes():
-        rows = _rows_exam_types()
-        headers = ["id", "modalidade", "nome", "codigo"]
-        return _csv_response("exam_types.csv", rows, headers)
+        return _csv_response("exam_types.csv", _rows_exam_types(), EXAMTYPES_HEADERS)
 
     @server.route("/export/doctors.csv")
+    @_conditional(DOCTORS_FILE)
     def export_doctors():
-        rows = _rows_doctors()
-        headers = ["id", "nome"]
-        return _csv_response("doctors.csv", rows, headers)
+        return _csv_response("doctors.csv", _rows_doctors(), DOCTORS_HEADERS)
 
     @server.route("/export/users.csv")
+    @_conditional(USERS_FILE)
     def export_users():
-        rows = _rows_users()
-        headers = ["id", "nome", "email", "modalidades_permitidas", "perfil"]
-        return _csv_response("users.csv", rows, headers)
+        return _csv_response("users.csv", _rows_users(), USERS_HEADERS)
 
     @server.route("/export/logs.csv")
+    @_conditional(LOGS_FILE)
     def export_logs():
-        rows = _rows_logs()
-        headers = ["ts", "user", "action", "entity", "entity_id"]
-        return _csv_response("logs.csv", rows, headers)
+        return _csv_response("logs.csv", _rows_logs(), LOGS_HEADERS)
 
     @server.route("/export/settings.json")
     def export_settings_json():
         return send_file(SETTINGS_FILE, mimetype="application/json", as_attachment=True, download_name="settings.json")
 
     @server.route("/export/notifications.csv")
+    @_conditional(NOTIFICATIONS_FILE)
     def export_notifications():
         # notifications.json é opcional
-        path = os.path.join(DATA_DIR, "notifications.json")
-        rows = read_json(path, {"notifications": []}).get("notifications", [])
+        rows = _cached_read_json(NOTIFICATIONS_FILE, {"notifications": []}).get("notifications", [])
         norm = []
         for n in rows:
-            base = {
+            canon = {
                 "id": n.get("id"),
                 "ts": n.get("ts") or n.get("created_at"),
                 "type": n.get("type") or n.get("categoria"),
@@ -339,44 +487,48 @@ def _ensure_routes():
                 "message": n.get("message") or n.get("mensagem"),
                 "user": n.get("user") or n.get("email"),
             }
-            for k, v in (n or {}).items():
-                if k not in base:
-                    base[k] = v
+            # campos canônicos primeiro, extras na ordem original; canônicos prevalecem
+            base = {**canon, **n}
+            base.update(canon)
             norm.append(base)
-        headers = []
-        for r in norm:
-            for k in r.keys():
-                if k not in headers:
-                    headers.append(k)
-        return _csv_response("notifications.csv", norm, headers or ["id", "ts", "type", "title", "message", "user"])
+        # dict como conjunto ordenado: mantém a ordem de 1ª aparição com busca O(1)
+        headers = list({k: None for r in norm for k in r}) or NOTIFICATIONS_HEADERS
+        return _csv_response("notifications.csv", map(_projector(*headers), norm), headers)
 
     @server.route("/export/all.zip")
+    @_conditional(MATERIALS_FILE, ESTOQUE_FILE, STOCK_MOV_FILE, EXAMS_FILE, EXAMTYPES_FILE,
+                  DOCTORS_FILE, USERS_FILE, LOGS_FILE, SETTINGS_FILE, NOTIFICATIONS_FILE)
     def export_all_zip():
         sep = request.args.get("sep", ",")
-        files: Dict[str, bytes] = {
-            "materials.csv": _bytes_csv(_rows_materials(), ["id", "nome", "tipo", "unidade", "valor_unitario", "estoque_inicial", "estoque_minimo"], sep),
-            "estoque.csv": _bytes_csv(_rows_estoque(), ["material_id", "lote_id", "lote", "validade", "saldo"], sep),
-            "stock_movements.csv": _bytes_csv(_rows_stock_movements(), ["id", "material_id", "tipo", "quantidade", "lote", "validade", "valor_unitario", "obs", "ts"], sep),
-            "exams.csv": _bytes_csv(_rows_exams(), ["id", "exam_id", "modalidade", "exame", "medico", "data_hora", "idade", "user_email", "custo_estimado_total"], sep),
-            "exam_items.csv": _bytes_csv(_rows_exam_items(), ["exam_id", "exam_code", "material_id", "lote_id", "quantidade", "valor_unitario", "subtotal"], sep),
-            "exam_types.csv": _bytes_csv(_rows_exam_types(), ["id", "modalidade", "nome", "codigo"], sep),
-            "doctors.csv": _bytes_csv(_rows_doctors(), ["id", "nome"], sep),
-            "users.csv": _bytes_csv(_rows_users(), ["id", "nome", "email", "modalidades_permitidas", "perfil"], sep),
-            "logs.csv": _bytes_csv(_rows_logs(), ["ts", "user", "action", "entity", "entity_id"], sep),
-        }
-        try:
-            with open(SETTINGS_FILE, "rb") as f:
-                files["settings.json"] = f.read()
-        except Exception:
-            pass
-        notif_path = os.path.join(DATA_DIR, "notifications.json")
-        if os.path.exists(notif_path):
-            with open(notif_path, "rb") as f:
-                files["notifications.json"] = f.read()
-        return _zip_response("export_all.zip", files)
-
-    server._export_routes_registered = True
-    _ROUTES_REGISTERED = True
+        _prefetch_json([
+            (MATERIALS_FILE, {"materials": []}),
+            (ESTOQUE_FILE, {}),
+            (STOCK_MOV_FILE, {"movements": []}),
+            (EXAMS_FILE, {"exams": []}),
+            (EXAMTYPES_FILE, {"exam_types": []}),
+            (DOCTORS_FILE, {"doctors": []}),
+            (USERS_FILE, {"users": []}),
+            (LOGS_FILE, {"logs": []}),
+        ])
+        exams, exam_items = _rows_exams_and_items()
+        members = [
+            ("materials.csv", _csv_member(_rows_materials, MATERIALS_HEADERS, sep, fast=True)),
+            ("estoque.csv", _csv_member(_rows_estoque, ESTOQUE_HEADERS, sep, fast=True)),
+            ("stock_movements.csv", _csv_member(_rows_stock_movements, STOCK_MOV_HEADERS, sep)),
+            ("exams.csv", _csv_member(lambda: exams, EXAMS_HEADERS, sep)),
+            ("exam_items.csv", _csv_member(lambda: exam_items, EXAM_ITEMS_HEADERS, sep, fast=True)),
+            ("exam_types.csv", _csv_member(_rows_exam_types, EXAMTYPES_HEADERS, sep)),
+            ("doctors.csv", _csv_member(_rows_doctors, DOCTORS_HEADERS, sep)),
+            ("users.csv", _csv_member(_rows_users, USERS_HEADERS, sep)),
+            ("logs.csv", _csv_member(_rows_logs, LOGS_HEADERS, sep)),
+        ]
+        if os.path.isfile(SETTINGS_FILE):
+            members.append(("settings.json", _file_member(SETTINGS_FILE)))
+        if os.path.exists(NOTIFICATIONS_FILE):
+            members.append(("notifications.json", _file_member(NOTIFICATIONS_FILE)))
+        return _zip_response("export_all.zip", members)
+
+    server.extensions[_ROUTES_FLAG] = True
 
 
 # >>> Registra as rotas AGORA (no import do módulo), antes do 1º request
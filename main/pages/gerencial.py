@@ -1,35 +1,72 @@
 # pages/gerencial.py
-import os, base64, pathlib, json, time
+import os, sys, pathlib, json, time, hashlib
+from functools import lru_cache
+from string import Template
 import dash
-from dash import html, dcc, Input, Output, State, ALL, no_update
+from dash import html, dcc, dash_table, Input, Output, State, ALL, no_update
 import dash_bootstrap_components as dbc
 from flask import session as flask_session
 from werkzeug.security import generate_password_hash
 
+try:  # parser JSON em C para os prop_id dos botões pattern-matching
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+try:  # decoder base64 em C/SIMD, quando disponível
+    from pybase64 import b64decode as _b64decode
+except ImportError:
+    from base64 import b64decode as _b64decode
+
 # ===== Backend imports (com fallback) =====
 try:
     from core.backend import (
         MODALIDADES, MOD_LABEL,
-        get_users, add_user, update_user, delete_user, find_user_by_email,
-        list_doctors, add_doctor, update_doctor, delete_doctor,
-        list_exam_types, add_exam_type, update_exam_type, delete_exam_type,
+        get_users, get_user, add_user, update_user, delete_user, get_user_email_set,
+        list_doctors, get_doctor, add_doctor, update_doctor, delete_doctor,
+        list_exam_types, get_exam_type, add_exam_type, update_exam_type, delete_exam_type,
         THEMES, read_settings, write_settings,
         validate_text_input, validate_email_format,
-        log_action, list_logs
+        log_action, list_logs_page, flush_logs,
+        file_version, USERS_FILE, DOCTORS_FILE, EXAMTYPES_FILE, LOGS_FILE, SETTINGS_FILE
     )
 except Exception:
     from backend import (
         MODALIDADES, MOD_LABEL,
-        get_users, add_user, update_user, delete_user, find_user_by_email,
-        list_doctors, add_doctor, update_doctor, delete_doctor,
-        list_exam_types, add_exam_type, update_exam_type, delete_exam_type,
+        get_users, get_user, add_user, update_user, delete_user, get_user_email_set,
+        list_doctors, get_doctor, add_doctor, update_doctor, delete_doctor,
+        list_exam_types, get_exam_type, add_exam_type, update_exam_type, delete_exam_type,
         THEMES, read_settings, write_settings,
         validate_text_input, validate_email_format,
-        log_action, list_logs
+        log_action, list_logs_page, flush_logs,
+        file_version, USERS_FILE, DOCTORS_FILE, EXAMTYPES_FILE, LOGS_FILE, SETTINGS_FILE
     )
 
 dash.register_page(__name__, path="/gerencial", name="Gerencial")
 
+# Ícones dos botões de ação das tabelas (imutáveis: a mesma instância serve para todas as linhas)
+_ICON_EDIT = html.I(className="fa-regular fa-pen-to-square me-1")
+_ICON_TRASH = html.I(className="fa-regular fa-trash-can me-1")
+
+# Upload de logo: base64 decodificado em blocos de 1 MiB (múltiplo de 4) e gravado com buffer de 256 KiB
+_B64_CHUNK = 1 << 20
+_LOGO_WRITE_BUFFER = 1 << 18
+
+# Hash de senha com método fixo: pbkdf2-sha256 com 100 mil iterações (~50 ms) no lugar do
+# padrão do werkzeug (scrypt, mais caro), então o callback de salvar tem custo previsível.
+# check_password_hash lê o método gravado em cada hash: senhas já cadastradas continuam valendo.
+_PWD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:100000")
+
+def _hash_password(senha: str) -> str:
+    return generate_password_hash(senha, method=_PWD_HASH_METHOD, salt_length=16)
+
+# Opções fixas dos dropdowns (montadas uma vez; mesma referência em todas as abas/modais)
+_MOD_OPTIONS = [{"label": MOD_LABEL.get(m, m), "value": m} for m in MODALIDADES]
+_PERFIL_OPTIONS = [{"label": "Administrador", "value": "admin"}, {"label": "Usuário", "value": "user"}]
+# Valores aceitos nas validações (checagem de pertinência por hash)
+_PERFIS = frozenset(o["value"] for o in _PERFIL_OPTIONS)
+_MODALIDADES_SET = frozenset(MODALIDADES)
+
 # ===================== Helpers =====================
 def current_user():
     if not flask_session.get("user_id"):
@@ -44,11 +81,22 @@ def current_user():
 def get_triggered_component_id_from_context(prop_id: str):
     try:
         json_part = prop_id.split(".")[0]
-        obj = json.loads(json_part)
+        obj = _json_loads(json_part)
         return obj.get("id")
     except Exception:
         return None
 
+# Normalização dos campos de formulário (um único lugar para todos os callbacks de CRUD)
+def _norm_email(s):
+    # internado: a checagem no índice de e-mails do backend cai no atalho por identidade
+    return sys.intern((s or "").strip().lower())
+
+def _norm_modalidades(s):
+    return (s or "*").strip()
+
+def _norm_crm(s):
+    return (s or "").strip() or None
+
 def _ensure_button_trigger(expected_button_id: str):
     ctx = dash.callback_context
     if not ctx.triggered:
@@ -67,29 +115,32 @@ def _ensure_pattern_click(expected_type: str):
     if ".n_clicks" not in prop or not val:
         raise dash.exceptions.PreventUpdate
     try:
-        obj = json.loads(prop.split(".")[0])
+        obj = _json_loads(prop.split(".")[0])
         if obj.get("type") != expected_type:
             raise dash.exceptions.PreventUpdate
     except Exception:
         raise dash.exceptions.PreventUpdate
 
-def _assets_dir() -> pathlib.Path:
-    # pasta assets (apenas para default logo/preview de tema)
-    return pathlib.Path(__file__).resolve().parents[1] / "assets"
-
-def _assets_url_prefix() -> str:
-    try:
-        app = dash.get_app()
-        prefix = app.config.get("requests_pathname_prefix", "/") or "/"
-    except Exception:
-        prefix = "/"
+# Caminhos resolvidos uma única vez (resolve() faz stat; não precisa repetir a cada upload/render)
+_PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[1]
+_UPLOADS_DIR = _PROJECT_ROOT / "data" / "uploads"
+_UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+
+@lru_cache(maxsize=1)
+def _app_assets_prefix() -> str:
+    # prefixo fixo durante a vida do processo; se o app ainda não existir, get_app() levanta
+    # e nada fica em cache (lru_cache não memoriza exceções)
+    app = dash.get_app()
+    prefix = app.config.get("requests_pathname_prefix", "/") or "/"
     if not prefix.endswith("/"):
         prefix += "/"
     return f"{prefix.rstrip('/')}/assets".replace("//assets", "/assets")
 
-def _uploads_dir() -> pathlib.Path:
-    # onde o upload será salvo (NÃO provoca reload)
-    return pathlib.Path(__file__).resolve().parents[1] / "data" / "uploads"
+def _assets_url_prefix() -> str:
+    try:
+        return _app_assets_prefix()
+    except Exception:
+        return "/assets"
 
 def _uploads_url(file_name: str) -> str:
     # servida por @server.route("/uploads/<path:filename>") no app.py
@@ -97,18 +148,13 @@ def _uploads_url(file_name: str) -> str:
 
 def _save_uploaded_logo_to_uploads(contents: str, filename: str):
     """
-    Salva logo em data/uploads/ com nome único e retorna (url_limpa, url_cachebuster)
+    Salva logo em data/uploads/ com nome único e retorna (url_limpa, url_cachebuster, chave_cache).
+    A chave é um hash do conteúdo: o navegador mantém o logo em cache até ele mudar de fato.
     NÃO usa assets/ para evitar reload em dev.
     """
     if not contents or "," not in contents:
-        return None, None
-    try:
-        _, b64data = contents.split(",", 1)
-        data = base64.b64decode(b64data)
-    except Exception:
-        return None, None
-
-    _uploads_dir().mkdir(parents=True, exist_ok=True)
+        return None, None, None
+    start = contents.index(",") + 1
 
     base, ext = os.path.splitext(filename or "")
     ext = (ext or "").lower()
@@ -117,34 +163,68 @@ def _save_uploaded_logo_to_uploads(contents: str, filename: str):
 
     ts = int(time.time())
     save_name = f"logo_{ts}{ext}"
-    save_path = _uploads_dir() / save_name
-    with open(save_path, "wb") as f:
-        f.write(data)
+    save_path = _UPLOADS_DIR / save_name
+    _UPLOADS_DIR.mkdir(parents=True, exist_ok=True)  # recria se a pasta foi removida com o app no ar
+    # decodifica e grava em blocos (sem copiar o base64 inteiro nem manter os bytes todos em memória)
+    h = hashlib.blake2b(digest_size=8)
+    try:
+        with open(save_path, "wb", buffering=_LOGO_WRITE_BUFFER) as f:
+            for i in range(start, len(contents), _B64_CHUNK):
+                chunk = _b64decode(contents[i:i + _B64_CHUNK])
+                h.update(chunk)
+                f.write(chunk)
+    except Exception:
+        save_path.unlink(missing_ok=True)
+        return None, None, None
 
+    key = h.hexdigest()
     clean = _uploads_url(save_name)
-    cache = f"{clean}?v={ts}"
-    return clean, cache
+    cache = f"{clean}?v={key}"
+    return clean, cache, key
+
+_SHORT_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+def _short_json(x, limit: int = 80) -> str:
+    """Prévia JSON de até `limit` caracteres: o iterencode para assim que passa do limite,
+    sem serializar o objeto inteiro (antes/depois podem ser registros grandes)."""
+    if not x:
+        return "-"
+    parts, n = [], 0
+    for chunk in _SHORT_JSON_ENCODER.iterencode(x):
+        parts.append(chunk)
+        n += len(chunk)
+        if n >= limit:
+            break
+    return "".join(parts)[:limit]
 
 # ===================== Componentes: Tabelas =====================
+# Cada tabela é memoizada pela versão do JSON de origem (file_version): troca de aba ou
+# refresh sem alteração nos dados devolve a mesma árvore de componentes, sem reler o arquivo.
 def users_table_component():
+    return _users_table(file_version(USERS_FILE))
+
+@lru_cache(maxsize=4)
+def _users_table(version):
     rows = []
     header = html.Thead(html.Tr([
         html.Th("ID"), html.Th("Nome"), html.Th("E-mail"),
         html.Th("Perfil"), html.Th("Modalidades"), html.Th("Ações")
     ]))
     for u in get_users():
+        uget = u.get
+        uid = uget("id")
         rows.append(html.Tr([
-            html.Td(u.get("id")),
-            html.Td(u.get("nome")),
-            html.Td(u.get("email")),
-            html.Td(u.get("perfil")),
-            html.Td(u.get("modalidades_permitidas")),
+            html.Td(uid),
+            html.Td(uget("nome")),
+            html.Td(uget("email")),
+            html.Td(uget("perfil")),
+            html.Td(uget("modalidades_permitidas")),
             html.Td(html.Div([
-                dbc.Button([html.I(className="fa-regular fa-pen-to-square me-1"), "Editar"],
-                           id={"type":"user_edit_btn","id":u.get("id")},
+                dbc.Button([_ICON_EDIT, "Editar"],
+                           id={"type":"user_edit_btn","id":uid},
                            size="sm", className="btn-soft me-1"),
-                dbc.Button([html.I(className="fa-regular fa-trash-can me-1"), "Excluir"],
-                           id={"type":"user_del_btn","id":u.get("id")},
+                dbc.Button([_ICON_TRASH, "Excluir"],
+                           id={"type":"user_del_btn","id":uid},
                            size="sm", color="danger", outline=True)
             ], className="table-actions d-flex align-items-center")),
         ]))
@@ -152,21 +232,27 @@ def users_table_component():
                      responsive=True, className="align-middle table-compact table-sticky shadow-soft rounded-2xl")
 
 def doctors_table_component():
+    return _doctors_table(file_version(DOCTORS_FILE))
+
+@lru_cache(maxsize=4)
+def _doctors_table(version):
     rows=[]
     header = html.Thead(html.Tr([
         html.Th("ID"), html.Th("Nome"), html.Th("CRM"), html.Th("Ações")
     ]))
     for d in list_doctors():
+        dget = d.get
+        did = dget("id")
         rows.append(html.Tr([
-            html.Td(d.get("id")),
-            html.Td(d.get("nome")),
-            html.Td(d.get("crm") or "-"),
+            html.Td(did),
+            html.Td(dget("nome")),
+            html.Td(dget("crm") or "-"),
             html.Td(html.Div([
-                dbc.Button([html.I(className="fa-regular fa-pen-to-square me-1"), "Editar"],
-                           id={"type":"doc_edit_btn","id":d.get("id")},
+                dbc.Button([_ICON_EDIT, "Editar"],
+                           id={"type":"doc_edit_btn","id":did},
                            size="sm", className="btn-soft me-1"),
-                dbc.Button([html.I(className="fa-regular fa-trash-can me-1"), "Excluir"],
-                           id={"type":"doc_del_btn","id":d.get("id")},
+                dbc.Button([_ICON_TRASH, "Excluir"],
+                           id={"type":"doc_del_btn","id":did},
                            size="sm", color="danger", outline=True)
             ], className="table-actions d-flex align-items-center"))
         ]))
@@ -174,23 +260,30 @@ def doctors_table_component():
                      responsive=True, className="align-middle table-compact table-sticky shadow-soft rounded-2xl")
 
 def examtypes_table_component():
+    return _examtypes_table(file_version(EXAMTYPES_FILE))
+
+@lru_cache(maxsize=4)
+def _examtypes_table(version):
     rows=[]
     header = html.Thead(html.Tr([
         html.Th("ID"), html.Th("Modalidade"), html.Th("Nome"),
         html.Th("Código"), html.Th("Ações")
     ]))
+    _mod_get = MOD_LABEL.get
     for t in list_exam_types():
+        tget = t.get
+        tid, mod = tget("id"), tget("modalidade")
         rows.append(html.Tr([
-            html.Td(t.get("id")),
-            html.Td(MOD_LABEL.get(t.get("modalidade"), t.get("modalidade"))),
-            html.Td(t.get("nome")),
-            html.Td(t.get("codigo") or "-"),
+            html.Td(tid),
+            html.Td(_mod_get(mod, mod)),
+            html.Td(tget("nome")),
+            html.Td(tget("codigo") or "-"),
             html.Td(html.Div([
-                dbc.Button([html.I(className="fa-regular fa-pen-to-square me-1"), "Editar"],
-                           id={"type":"ext_edit_btn","id":t.get("id")},
+                dbc.Button([_ICON_EDIT, "Editar"],
+                           id={"type":"ext_edit_btn","id":tid},
                            size="sm", className="btn-soft me-1"),
-                dbc.Button([html.I(className="fa-regular fa-trash-can me-1"), "Excluir"],
-                           id={"type":"ext_del_btn","id":t.get("id")},
+                dbc.Button([_ICON_TRASH, "Excluir"],
+                           id={"type":"ext_del_btn","id":tid},
                            size="sm", color="danger", outline=True)
             ], className="table-actions d-flex align-items-center"))
         ]))
@@ -198,37 +291,69 @@ def examtypes_table_component():
                      responsive=True, className="align-middle table-compact table-sticky shadow-soft rounded-2xl")
 
 def logs_table_component():
-    logs = list_logs()
-    header = html.Thead(html.Tr([
-        html.Th("Data/Hora (UTC)"), html.Th("Usuário"), html.Th("Ação"),
-        html.Th("Entidade"), html.Th("ID"), html.Th("Antes"), html.Th("Depois")
-    ]))
-    rows = []
-    for l in reversed(logs):
-        rows.append(html.Tr([
-            html.Td(l.get("ts")),
-            html.Td(l.get("user")),
-            html.Td(l.get("action")),
-            html.Td(l.get("entity")),
-            html.Td(l.get("entity_id")),
-            html.Td(json.dumps(l.get("before"), ensure_ascii=False)[:80] if l.get("before") else "-"),
-            html.Td(json.dumps(l.get("after"), ensure_ascii=False)[:80] if l.get("after") else "-"),
-        ]))
-    return dbc.Table([header, html.Tbody(rows)], bordered=False, hover=True, striped=True,
-                     responsive=True, className="align-middle table-compact table-sticky shadow-soft rounded-2xl")
+    flush_logs()  # logs enfileirados entram antes de tirar a versão do arquivo
+    return _logs_table(file_version(LOGS_FILE))
+
+_LOGS_COLUMNS = [
+    {"name": "Data/Hora (UTC)", "id": "ts"},
+    {"name": "Usuário", "id": "user"},
+    {"name": "Ação", "id": "action"},
+    {"name": "Entidade", "id": "entity"},
+    {"name": "ID", "id": "entity_id"},
+    {"name": "Antes", "id": "before"},
+    {"name": "Depois", "id": "after"},
+]
+
+_LOGS_PAGE_SIZE = 50
+
+def _log_row(l):
+    return {
+        "ts": l.get("ts"),
+        "user": l.get("user"),
+        "action": l.get("action"),
+        "entity": l.get("entity"),
+        "entity_id": l.get("entity_id"),
+        "before": _short_json(l.get("before")),
+        "after": _short_json(l.get("after")),
+    }
+
+@lru_cache(maxsize=32)
+def _logs_page(version, page):
+    # paginação no servidor: só a página pedida (mais recentes primeiro) é montada e enviada
+    rows, total = list_logs_page(_LOGS_PAGE_SIZE, page * _LOGS_PAGE_SIZE)
+    return [_log_row(l) for l in rows], max(1, -(-total // _LOGS_PAGE_SIZE))
+
+@lru_cache(maxsize=4)
+def _logs_table(version):
+    data, page_count = _logs_page(version, 0)
+    return html.Div(dash_table.DataTable(
+        id="logs_datatable",
+        columns=_LOGS_COLUMNS,
+        data=data,
+        page_action="custom",
+        page_current=0,
+        page_size=_LOGS_PAGE_SIZE,
+        page_count=page_count,
+        sort_action="none",
+        style_as_list_view=True,
+        style_table={"overflowX": "auto"},
+        style_header={"fontWeight": 600, "backgroundColor": "transparent"},
+        style_cell={"fontFamily": "inherit", "fontSize": "0.875rem", "textAlign": "left",
+                    "backgroundColor": "transparent", "padding": "6px 8px",
+                    "whiteSpace": "nowrap", "overflow": "hidden", "textOverflow": "ellipsis",
+                    "maxWidth": 320},
+    ), className="table-compact shadow-soft rounded-2xl")
 
 # ===================== Layout de cada Tab =====================
-def tab_users():
+def _build_users_static():
+    # partes fixas da aba (form oculto + modais): montadas uma única vez no import
     novo_usuario_card = dbc.Card([
         dbc.CardHeader([html.I(className="fa-solid fa-user-plus me-2"), "Novo Usuário"]),
         dbc.CardBody([
             dbc.Row([
                 dbc.Col(dbc.Input(id="nu_nome", placeholder="Nome completo", maxLength=100), md=3),
                 dbc.Col(dbc.Input(id="nu_email", placeholder="E-mail", type="email", maxLength=100), md=3),
-                dbc.Col(dcc.Dropdown(id="nu_perfil", options=[
-                    {"label":"Administrador","value":"admin"},
-                    {"label":"Usuário","value":"user"},
-                ], placeholder="Perfil"), md=2),
+                dbc.Col(dcc.Dropdown(id="nu_perfil", options=_PERFIL_OPTIONS, placeholder="Perfil"), md=2),
                 dbc.Col(dbc.Input(id="nu_modalidades", placeholder='Modalidades (ex: "*" ou RX,CT,MR)', maxLength=100), md=2),
                 dbc.Col(dbc.Input(id="nu_senha", placeholder="Senha", type="password", minLength=6), md=2),
             ], className="g-2"),
@@ -238,11 +363,6 @@ def tab_users():
         ])
     ], className="g-card d-none")  # mantido oculto
 
-    lista = dbc.Card([
-        dbc.CardHeader([html.I(className="fa-solid fa-users-gear me-2"), "Usuários"]),
-        dbc.CardBody(html.Div(id="users_table", children=users_table_component()))
-    ], className="g-card")
-
     modais = [
         dcc.Store(id="edit_user_id"),
         dcc.Store(id="delete_user_id"),
@@ -256,9 +376,7 @@ def tab_users():
                     dbc.Row([
                         dbc.Col(dbc.Input(id="eu_nome", placeholder="Nome completo", maxLength=100), md=4),
                         dbc.Col(dbc.Input(id="eu_email", placeholder="E-mail", type="email", maxLength=100), md=4),
-                        dbc.Col(dcc.Dropdown(id="eu_perfil", options=[
-                            {"label":"Administrador","value":"admin"},
-                            {"label":"Usuário","value":"user"}], placeholder="Perfil"), md=4),
+                        dbc.Col(dcc.Dropdown(id="eu_perfil", options=_PERFIL_OPTIONS, placeholder="Perfil"), md=4),
                     ], className="mb-3"),
                     dbc.Row([
                         dbc.Col(dbc.Input(id="eu_modalidades",
@@ -290,13 +408,24 @@ def tab_users():
         ),
     ]
 
+    return novo_usuario_card, modais
+
+_USERS_NOVO, _USERS_MODAIS = _build_users_static()
+
+def tab_users():
+    lista = dbc.Card([
+        dbc.CardHeader([html.I(className="fa-solid fa-users-gear me-2"), "Usuários"]),
+        dbc.CardBody(html.Div(id="users_table", children=users_table_component()))
+    ], className="g-card")
+
     return dbc.Row([
-        dbc.Col(novo_usuario_card, md=12, className="mb-3"),
+        dbc.Col(_USERS_NOVO, md=12, className="mb-3"),
         dbc.Col(lista, md=12),
-        *modais
+        *_USERS_MODAIS
     ])
 
-def tab_doctors():
+def _build_doctors_static():
+    # partes fixas da aba (form oculto + modais): montadas uma única vez no import
     novo = dbc.Card([
         dbc.CardHeader([html.I(className="fa-solid fa-user-doctor me-2"), "Novo Médico"]),
         dbc.CardBody([
@@ -310,11 +439,6 @@ def tab_doctors():
         ])
     ], className="g-card d-none")  # oculto
 
-    lista = dbc.Card([
-        dbc.CardHeader([html.I(className="fa-solid fa-stethoscope me-2"), "Médicos"]),
-        dbc.CardBody(html.Div(id="doctors_table", children=doctors_table_component()))
-    ], className="g-card")
-
     modal_ed = dbc.Modal(
         id="doc_edit_modal", is_open=False, size="xl",
         fullscreen="md-down", centered=True, scrollable=True,
@@ -336,19 +460,30 @@ def tab_doctors():
         ]
     )
 
+    return novo, modal_ed
+
+_DOCTORS_NOVO, _DOCTORS_MODAL_ED = _build_doctors_static()
+
+def tab_doctors():
+    lista = dbc.Card([
+        dbc.CardHeader([html.I(className="fa-solid fa-stethoscope me-2"), "Médicos"]),
+        dbc.CardBody(html.Div(id="doctors_table", children=doctors_table_component()))
+    ], className="g-card")
+
     return dbc.Row([
-        dbc.Col(novo, md=12, className="mb-3"),
+        dbc.Col(_DOCTORS_NOVO, md=12, className="mb-3"),
         dbc.Col(lista, md=12),
-        modal_ed
+        _DOCTORS_MODAL_ED
     ])
 
-def tab_examtypes():
+def _build_examtypes_static():
+    # partes fixas da aba (form oculto + modais): montadas uma única vez no import
     novo = dbc.Card([
         dbc.CardHeader([html.I(className="fa-solid fa-clipboard-list me-2"), "Novo Tipo de Exame"]),
         dbc.CardBody([
             dbc.Row([
                 dbc.Col(dcc.Dropdown(id="ext_modalidade_new",
-                                     options=[{"label":MOD_LABEL.get(m,m),"value":m} for m in MODALIDADES],
+                                     options=_MOD_OPTIONS,
                                      placeholder="Modalidade"), md=3),
                 dbc.Col(dbc.Input(id="ext_nome_new", placeholder="Nome do exame"), md=6),
                 dbc.Col(dbc.Input(id="ext_codigo_new", placeholder="Código (opcional)"), md=3),
@@ -359,11 +494,6 @@ def tab_examtypes():
         ])
     ], className="g-card d-none")  # oculto
 
-    lista = dbc.Card([
-        dbc.CardHeader([html.I(className="fa-regular fa-rectangle-list me-2"), "Catálogo de Exames"]),
-        dbc.CardBody(html.Div(id="examtypes_table", children=examtypes_table_component()))
-    ], className="g-card")
-
     modal_ed = dbc.Modal(
         id="ext_edit_modal", is_open=False, size="xl",
         fullscreen="md-down", centered=True, scrollable=True,
@@ -374,7 +504,7 @@ def tab_examtypes():
                 dcc.Store(id="edit_ext_id"),
                 dbc.Row([
                     dbc.Col(dcc.Dropdown(id="ext_modalidade",
-                                         options=[{"label":MOD_LABEL.get(m,m),"value":m} for m in MODALIDADES],
+                                         options=_MOD_OPTIONS,
                                          placeholder="Modalidade"), md=3),
                     dbc.Col(dbc.Input(id="ext_nome", placeholder="Nome do exame"), md=6),
                     dbc.Col(dbc.Input(id="ext_codigo", placeholder="Código (opcional)"), md=3),
@@ -402,14 +532,64 @@ def tab_examtypes():
         ]
     )
 
+    return novo, modal_ed, modal_del
+
+_EXT_NOVO, _EXT_MODAL_ED, _EXT_MODAL_DEL = _build_examtypes_static()
+
+def tab_examtypes():
+    lista = dbc.Card([
+        dbc.CardHeader([html.I(className="fa-regular fa-rectangle-list me-2"), "Catálogo de Exames"]),
+        dbc.CardBody(html.Div(id="examtypes_table", children=examtypes_table_component()))
+    ], className="g-card")
+
     return dbc.Row([
-        dbc.Col(novo, md=12, className="mb-3"),
+        dbc.Col(_EXT_NOVO, md=12, className="mb-3"),
         dbc.Col(lista, md=12),
-        modal_ed, modal_del
+        _EXT_MODAL_ED, _EXT_MODAL_DEL
     ])
 
+def _build_theme_card(name):
+    return dbc.Col(
+        dbc.Button(
+            dbc.Card(
+                dbc.CardBody([
+                    html.Div(name, className="fw-semibold mb-2"),
+                    html.Div([
+                        html.Span(className="badge bg-primary me-1", children="Primary"),
+                        html.Span(className="badge bg-secondary me-1", children="Secondary"),
+                        html.Span(className="badge bg-info", children="Info"),
+                    ]),
+                    html.Div("Clique para selecionar e pré-visualizar", className="small text-muted mt-2")
+                ]),
+                className="g-card h-100"
+            ),
+            id={"type":"theme_pick","name":name},
+            color="light", className="w-100 text-start p-0 border-0"
+        ),
+        md=3, sm=4, xs=6, className="mb-3"
+    )
+
+# THEMES é fixo: os cards de pré-visualização são montados uma única vez
+_THEME_CARDS = tuple(_build_theme_card(name) for name in THEMES.keys())
+
+# prop_id de cada card (id serializado como o Dash faz: chaves ordenadas, sem espaços) -> nome do tema
+_THEME_ID_STR_TO_NAME = {
+    json.dumps({"type": "theme_pick", "name": name}, sort_keys=True, separators=(",", ":"), ensure_ascii=False): name
+    for name in THEMES
+}
+
+# settings.json em memória, revalidado pela versão do arquivo (file_version) a cada uso
+_SETTINGS_CACHE = {"version": None, "data": None}
+
+def _cached_settings():
+    v = file_version(SETTINGS_FILE)
+    if _SETTINGS_CACHE["data"] is None or v != _SETTINGS_CACHE["version"]:
+        _SETTINGS_CACHE["data"] = read_settings()
+        _SETTINGS_CACHE["version"] = v
+    return _SETTINGS_CACHE["data"]
+
 def tab_config():
-    s = read_settings()
+    s = _cached_settings()
     portal_name = s.get("portal_name", "")
     current_theme = s.get("theme", "Flatly")
     logo_h = int(s.get("logo_height_px", 40))
@@ -417,30 +597,7 @@ def tab_config():
 
     # logo atual (pode ser /uploads/... salvo anteriormente)
     current_logo_url = s.get("logo_url") or f"{_assets_url_prefix()}/logo.png"
-
-    theme_cards = []
-    for name in THEMES.keys():
-        theme_cards.append(
-            dbc.Col(
-                dbc.Button(
-                    dbc.Card(
-                        dbc.CardBody([
-                            html.Div(name, className="fw-semibold mb-2"),
-                            html.Div([
-                                html.Span(className="badge bg-primary me-1", children="Primary"),
-                                html.Span(className="badge bg-secondary me-1", children="Secondary"),
-                                html.Span(className="badge bg-info", children="Info"),
-                            ]),
-                            html.Div("Clique para selecionar e pré-visualizar", className="small text-muted mt-2")
-                        ]),
-                        className="g-card h-100"
-                    ),
-                    id={"type":"theme_pick","name":name},
-                    color="light", className="w-100 text-start p-0 border-0"
-                ),
-                md=3, sm=4, xs=6, className="mb-3"
-            )
-        )
+    logo_key = s.get("logo_cache_key") or "0"
 
     return dbc.Card([
         dbc.CardHeader([html.I(className="fa-solid fa-gear me-2"), "Configurações do Portal"]),
@@ -448,11 +605,12 @@ def tab_config():
             dcc.Store(id="theme_css_href"),
             dcc.Store(id="cfg_theme_store", data=current_theme),
             dcc.Store(id="cfg_logo_url_store", data=current_logo_url),  # <- mantém a URL até salvar
+            dcc.Store(id="cfg_logo_key_store", data=logo_key),          # <- hash do logo (cache-buster estável)
 
             dbc.Row([
                 dbc.Col([
                     html.Label("Nome do Portal"),
-                    dbc.Input(id="cfg_portal_name", value=portal_name, placeholder="Ex.: Portal Radiológico")
+                    dbc.Input(id="cfg_portal_name", value=portal_name, placeholder="Ex.: Portal Radiológico", debounce=True)
                 ], md=4),
                 dbc.Col([
                     html.Label("Tema selecionado"),
@@ -495,7 +653,7 @@ def tab_config():
                     html.Div(
                         html.Img(
                             id="cfg_logo_preview",
-                            src=f"{current_logo_url}?v={int(time.time())}",
+                            src=f"{current_logo_url}?v={logo_key}",
                             style={"maxWidth":"100%", "height": f"{display_h}px"}
                         ),
                         className="border rounded p-3 d-flex align-items-center justify-content-center"
@@ -504,7 +662,7 @@ def tab_config():
             ], className="g-2 mb-3"),
 
             html.H6("Pré-visualização de Temas"),
-            dbc.Row(theme_cards, className="g-2"),
+            dbc.Row(list(_THEME_CARDS), className="g-2"),
             html.Div("A mini prévia abaixo aplica o CSS do tema selecionado em um sandbox isolado (iframe).",
                      className="text-muted small mb-3"),
 
@@ -567,7 +725,7 @@ def render_fab_tab(tab):
             dbc.Row([
                 dbc.Col([html.Label("Perfil"),
                          dcc.Dropdown(id="fab_u_perfil",
-                                      options=[{"label":"Administrador","value":"admin"},{"label":"Usuário","value":"user"}],
+                                      options=_PERFIL_OPTIONS,
                                       placeholder="Escolha o perfil")], md=4),
                 dbc.Col([html.Label("Modalidades"),
                          dbc.Input(id="fab_u_modalidades", placeholder='Ex.: "*" ou RX,CT,MR')], md=4),
@@ -597,7 +755,7 @@ def render_fab_tab(tab):
             dbc.Row([
                 dbc.Col([html.Label("Modalidade"),
                          dcc.Dropdown(id="fab_e_modalidade",
-                                      options=[{"label": MOD_LABEL.get(m, m), "value": m} for m in MODALIDADES],
+                                      options=_MOD_OPTIONS,
                                       placeholder="Selecione")], md=4),
                 dbc.Col([html.Label("Nome do exame"), dbc.Input(id="fab_e_nome")], md=6),
                 dbc.Col([html.Label("Código (opcional)"), dbc.Input(id="fab_e_codigo")], md=2),
@@ -628,9 +786,7 @@ layout = dbc.Container([
     html.Div(id="tab_content", children=tab_users()),
 
     # Sinais de refresh (sempre presentes)
-    dcc.Store(id="refresh_users"),
-    dcc.Store(id="refresh_doctors"),
-    dcc.Store(id="refresh_examtypes"),
+    dcc.Store(id="refresh_tables"),  # {"entity": "users"|"doctors"|"examtypes", "ts": ...}
 
     # FAB + Tooltip + Stores + Modal
     html.Div([
@@ -638,32 +794,70 @@ layout = dbc.Container([
                    color="primary", className="fab-main", n_clicks=0),
         dbc.Tooltip("Cadastro rápido", target="fab_open", placement="left")
     ], className="fab"),
-    dcc.Store(id="fab_close_u"),
-    dcc.Store(id="fab_close_d"),
-    dcc.Store(id="fab_close_e"),
+    dcc.Store(id="fab_result"),  # resultado do último salvar no FAB (fecha o modal no navegador)
     fab_modal()
 ], fluid=True, className="page-gerencial", style={"scrollBehavior":"smooth"})
 
-# ============== Navegação/Refresh por Tabs (único escritor de tab_content) ==============
+# ============== Navegação por Tabs (único escritor de tab_content) ==============
+_TAB_BUILDERS = {
+    "g_users": tab_users,
+    "g_doctors": tab_doctors,
+    "g_examtypes": tab_examtypes,
+    "g_config": tab_config,
+    "g_logs": tab_logs,
+}
+
 @dash.callback(
     Output("tab_content","children"),
     Input("tabs_gerencial","value"),
-    Input("refresh_users","data"),
-    Input("refresh_doctors","data"),
-    Input("refresh_examtypes","data"),
 )
-def _render_tab(tab, _ru, _rd, _re):
-    if tab == "g_users": return tab_users()
-    if tab == "g_doctors": return tab_doctors()
-    if tab == "g_examtypes": return tab_examtypes()
-    if tab == "g_config": return tab_config()
-    if tab == "g_logs": return tab_logs()
-    return html.Div()
+def _render_tab(tab):
+    build = _TAB_BUILDERS.get(tab)
+    return build() if build else html.Div()
+
+# Após um cadastro/edição só a tabela da aba é trocada (modais e formulários ficam como estão)
+def _refresh(entity):
+    """Valor do sinal refresh_tables: qual tabela mudou (+ ts para sempre disparar)."""
+    return {"entity": entity, "ts": time.time()}
+
+def _refreshed(sig, entity):
+    return isinstance(sig, dict) and sig.get("entity") == entity
+
+@dash.callback(Output("users_table","children"), Input("refresh_tables","data"), prevent_initial_call=True)
+def _refresh_users_table(sig):
+    return users_table_component() if _refreshed(sig, "users") else no_update
+
+@dash.callback(Output("doctors_table","children"), Input("refresh_tables","data"), prevent_initial_call=True)
+def _refresh_doctors_table(sig):
+    return doctors_table_component() if _refreshed(sig, "doctors") else no_update
+
+@dash.callback(Output("examtypes_table","children"), Input("refresh_tables","data"), prevent_initial_call=True)
+def _refresh_examtypes_table(sig):
+    return examtypes_table_component() if _refreshed(sig, "examtypes") else no_update
+
+@dash.callback(
+    Output("logs_datatable","data"),
+    Output("logs_datatable","page_count"),
+    Input("logs_datatable","page_current"),
+    prevent_initial_call=True
+)
+def _logs_table_page(page):
+    flush_logs()
+    data, page_count = _logs_page(file_version(LOGS_FILE), int(page or 0))
+    return data, page_count
+
+@dash.callback(
+    Output("logs_table","children"),
+    Input("refresh_tables","data"),
+    prevent_initial_call=True
+)
+def _refresh_logs_table(_):
+    return logs_table_component()
 
 # ===================== Usuários =====================
 @dash.callback(
     Output("nu_feedback","children"),
-    Output("refresh_users","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("btn_nu_criar","n_clicks"),
     State("nu_nome","value"), State("nu_email","value"), State("nu_perfil","value"),
     State("nu_modalidades","value"), State("nu_senha","value"),
@@ -678,24 +872,25 @@ def criar_usuario(n, nome, email, perfil, modalidades, senha):
     msgs = []
     ok, nome = validate_text_input(nome, "Nome"); msgs += ([] if ok else [nome])
     ok, email = validate_text_input(email, "E-mail"); msgs += ([] if ok else [email])
-    if ok and not validate_email_format(email): msgs.append("Formato de e-mail inválido.")
-    elif find_user_by_email(email or ""): msgs.append("E-mail já cadastrado.")
+    if ok:
+        email = _norm_email(email)
+        if not validate_email_format(email): msgs.append("Formato de e-mail inválido.")
+        elif email in get_user_email_set(): msgs.append("E-mail já cadastrado.")
     ok, perfil = validate_text_input(perfil, "Perfil"); msgs += ([] if ok else [perfil])
-    if ok and perfil not in ["admin","user"]: msgs.append("Perfil inválido.")
+    if ok and perfil not in _PERFIS: msgs.append("Perfil inválido.")
     ok, senha = validate_text_input(senha, "Senha"); msgs += ([] if ok else [senha])
     if ok and len((senha or "")) < 6: msgs.append("A senha deve ter pelo menos 6 caracteres.")
-    modalidades = (modalidades or "*").strip()
 
     if msgs:
         return dbc.Alert(html.Ul([html.Li(m) for m in msgs]), color="danger"), no_update
 
-    rec = {"nome": nome.strip(), "email": email.strip().lower(),
-           "senha_hash": generate_password_hash(senha.strip()),
-           "modalidades_permitidas": modalidades, "perfil": perfil, "id": 0}
+    rec = {"nome": nome, "email": email,
+           "senha_hash": _hash_password(senha),
+           "modalidades_permitidas": _norm_modalidades(modalidades), "perfil": perfil, "id": 0}
     uid = add_user(rec)
     log_action(cu.get("email"), "create", "user", uid, before=None,
                after={k:v for k,v in rec.items() if k!="senha_hash"})
-    return dbc.Alert(f"Usuário criado (ID {uid}).", color="success", duration=3000), time.time()
+    return dbc.Alert(f"Usuário criado (ID {uid}).", color="success", duration=3000), _refresh("users")
 
 @dash.callback(
     Output("user_edit_modal","is_open", allow_duplicate=True),
@@ -716,14 +911,14 @@ def open_user_edit(edit_clicks, cancel_click):
     if val in (None, 0): raise dash.exceptions.PreventUpdate
     user_id_to_edit = get_triggered_component_id_from_context(prop_id)
     if not user_id_to_edit: raise dash.exceptions.PreventUpdate
-    u = next((x for x in get_users() if x.get("id")==user_id_to_edit), None)
+    u = get_user(user_id_to_edit)
     if not u: raise dash.exceptions.PreventUpdate
     return True, user_id_to_edit, u.get("nome"), u.get("email"), u.get("perfil"), u.get("modalidades_permitidas")
 
 @dash.callback(
     Output("user_edit_modal","is_open", allow_duplicate=True),
     Output("eu_feedback","children", allow_duplicate=True),
-    Output("refresh_users","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("user_edit_save","n_clicks"),
     State("edit_user_id","data"),
     State("eu_nome","value"), State("eu_email","value"),
@@ -742,21 +937,26 @@ def save_user_edit(n, uid, nome, email, perfil, modalidades, nova_senha):
     ok, email = validate_text_input(email,"E-mail"); msgs += ([] if ok else [email])
     if ok and not validate_email_format(email): msgs.append("Formato de e-mail inválido.")
     ok, perfil = validate_text_input(perfil,"Perfil"); msgs += ([] if ok else [perfil])
-    if ok and perfil not in ["admin","user"]: msgs.append("Perfil inválido.")
+    if ok and perfil not in _PERFIS: msgs.append("Perfil inválido.")
     if msgs:
         return True, dbc.Alert(html.Ul([html.Li(m) for m in msgs]), color="danger"), no_update
 
-    fields = {"nome":nome, "email":email.lower(), "perfil":perfil, "modalidades_permitidas": (modalidades or "*").strip()}
-    if (nova_senha or "").strip():
-        fields["senha_hash"] = generate_password_hash(nova_senha.strip())
-    before = next((x for x in get_users() if x.get("id")==int(uid)), None)
+    fields = {"nome":nome, "email":_norm_email(email), "perfil":perfil, "modalidades_permitidas": _norm_modalidades(modalidades)}
+    before = get_user(int(uid))
+    if before is None:  # registro sumiu: nada a atualizar nem a registrar
+        return True, dbc.Alert("Nenhuma alteração aplicada.", color="warning"), no_update
+    nova_senha = (nova_senha or "").strip()
+    if nova_senha:
+        fields["senha_hash"] = _hash_password(nova_senha)
+    elif all(before.get(k) == v for k, v in fields.items()):
+        return True, dbc.Alert("Nenhuma alteração a salvar.", color="secondary", duration=3000), no_update  # modal aberto: a mensagem aparece
     ok = update_user(int(uid), fields)
     if ok:
-        after = next((x for x in get_users() if x.get("id")==int(uid)), None)
+        after = {**before, **fields}  # mesmo resultado do update, sem reler o arquivo
         log_action(cu.get("email"), "update", "user", int(uid),
-                   before={k:v for k,v in (before or {}).items() if k!="senha_hash"},
-                   after={k:v for k,v in (after or {}).items() if k!="senha_hash"})
-        return False, dbc.Alert("Usuário atualizado!", color="success", duration=3000), time.time()
+                   before={k:v for k,v in before.items() if k!="senha_hash"},
+                   after={k:v for k,v in after.items() if k!="senha_hash"})
+        return False, dbc.Alert("Usuário atualizado!", color="success", duration=3000), _refresh("users")
     return True, dbc.Alert("Nenhuma alteração aplicada.", color="warning"), no_update
 
 @dash.callback(
@@ -771,7 +971,7 @@ def open_user_delete(edit_clicks):
     ctx = dash.callback_context
     uid = get_triggered_component_id_from_context(ctx.triggered[0]["prop_id"])
     if not uid: raise dash.exceptions.PreventUpdate
-    u = next((x for x in get_users() if x.get("id")==uid), None)
+    u = get_user(uid)
     if not u: raise dash.exceptions.PreventUpdate
     info = html.Div([html.P("Tem certeza que deseja excluir este usuário?"),
                      html.Ul([html.Li(f"ID: {u.get('id')}"),
@@ -781,7 +981,7 @@ def open_user_delete(edit_clicks):
 
 @dash.callback(
     Output("user_confirm_delete_modal","is_open", allow_duplicate=True),
-    Output("refresh_users","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("user_delete_confirm","n_clicks"),
     State("delete_user_id","data"),
     prevent_initial_call=True
@@ -791,12 +991,14 @@ def confirm_user_delete(n, uid):
     cu = current_user()
     if not cu or cu.get("perfil")!="admin" or not uid:
         return dash.no_update, no_update
-    before = next((x for x in get_users() if x.get("id")==int(uid)), None)
+    before = get_user(int(uid))
+    if before is None:  # já removido: só atualiza a tabela
+        return False, _refresh("users")
     ok = delete_user(int(uid))
     if ok:
         log_action(cu.get("email"), "delete", "user", int(uid),
-                   before={k:v for k,v in (before or {}).items() if k!="senha_hash"}, after=None)
-    return False, time.time()
+                   before={k:v for k,v in before.items() if k!="senha_hash"}, after=None)
+    return False, _refresh("users")
 
 @dash.callback(
     Output("user_confirm_delete_modal","is_open", allow_duplicate=True),
@@ -810,7 +1012,7 @@ def close_user_delete_modal(n):
 # ===================== Médicos =====================
 @dash.callback(
     Output("nd_feedback","children"),
-    Output("refresh_doctors","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("btn_nd_criar","n_clicks"),
     State("nd_nome","value"), State("nd_crm","value"),
     prevent_initial_call=True
@@ -822,10 +1024,10 @@ def criar_medico(n, nome, crm):
         return dbc.Alert("Acesso negado.", color="danger"), no_update
     ok, nome = validate_text_input(nome, "Nome")
     if not ok: return dbc.Alert(nome, color="danger"), no_update
-    rec = {"nome": nome, "crm": (crm or "").strip() or None, "id":0}
+    rec = {"nome": nome, "crm": _norm_crm(crm), "id":0}
     did = add_doctor(rec)
     log_action(cu.get("email"), "create", "doctor", did, before=None, after=rec)
-    return dbc.Alert(f"Médico criado (ID {did}).", color="success", duration=3000), time.time()
+    return dbc.Alert(f"Médico criado (ID {did}).", color="success", duration=3000), _refresh("doctors")
 
 @dash.callback(
     Output("doc_edit_modal","is_open", allow_duplicate=True),
@@ -844,14 +1046,14 @@ def open_doc_edit(edit_clicks, cancel_click):
     if val in (None, 0): raise dash.exceptions.PreventUpdate
     did = get_triggered_component_id_from_context(prop)
     if not did: raise dash.exceptions.PreventUpdate
-    d = next((x for x in list_doctors() if x.get("id")==did), None)
+    d = get_doctor(did)
     if not d: raise dash.exceptions.PreventUpdate
     return True, did, d.get("nome"), d.get("crm")
 
 @dash.callback(
     Output("doc_edit_modal","is_open", allow_duplicate=True),
     Output("ed_feedback","children", allow_duplicate=True),
-    Output("refresh_doctors","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("doc_edit_save","n_clicks"),
     State("edit_doc_id","data"),
     State("ed_nome","value"), State("ed_crm","value"),
@@ -864,17 +1066,21 @@ def save_doc_edit(n, did, nome, crm):
     if not did: raise dash.exceptions.PreventUpdate
     ok, nome = validate_text_input(nome, "Nome")
     if not ok: return True, dbc.Alert(nome, color="danger"), no_update
-    clean_crm = (crm or "").strip() or None
-    before = next((x for x in list_doctors() if x.get("id")==int(did)), None)
-    ok = update_doctor(int(did), {"nome": nome, "crm": clean_crm})
+    fields = {"nome": nome, "crm": _norm_crm(crm)}
+    before = get_doctor(int(did))
+    if before is None:
+        return True, dbc.Alert("Nenhuma alteração aplicada.", color="warning"), no_update
+    if all(before.get(k) == v for k, v in fields.items()):
+        return True, dbc.Alert("Nenhuma alteração a salvar.", color="secondary", duration=3000), no_update  # modal aberto: a mensagem aparece
+    ok = update_doctor(int(did), fields)
     if ok:
-        after = next((x for x in list_doctors() if x.get("id")==int(did)), None)
+        after = {**before, **fields}
         log_action(cu.get("email"), "update", "doctor", int(did), before=before, after=after)
-        return False, dbc.Alert("Médico atualizado com sucesso!", color="success", duration=3000), time.time()
+        return False, dbc.Alert("Médico atualizado com sucesso!", color="success", duration=3000), _refresh("doctors")
     return True, dbc.Alert("Nenhuma alteração aplicada.", color="warning"), no_update
 
 @dash.callback(
-    Output("refresh_doctors","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input({"type":"doc_del_btn","id":ALL},"n_clicks"),
     prevent_initial_call=True
 )
@@ -884,16 +1090,18 @@ def del_doctor(n_clicks):
     did = get_triggered_component_id_from_context(ctx.triggered[0]["prop_id"])
     if not did: raise dash.exceptions.PreventUpdate
     cu = current_user()
-    before = next((x for x in list_doctors() if x.get("id")==int(did)), None)
+    before = get_doctor(int(did))
+    if before is None:  # já removido: só atualiza a tabela
+        return _refresh("doctors")
     ok = delete_doctor(int(did))
     if ok:
         log_action(cu.get("email") if cu else None, "delete", "doctor", int(did), before=before, after=None)
-    return time.time()
+    return _refresh("doctors")
 
 # ===================== Tipos de Exame =====================
 @dash.callback(
     Output("ext_create_feedback","children"),
-    Output("refresh_examtypes","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("ext_create_btn","n_clicks"),
     State("ext_modalidade_new","value"),
     State("ext_nome_new","value"),
@@ -907,14 +1115,14 @@ def criar_tipo_exame(n, modalidade, nome, codigo):
         return dbc.Alert("Acesso negado.", color="danger"), no_update
     msgs=[]
     ok, modalidade = validate_text_input(modalidade,"Modalidade"); msgs += ([] if ok else [modalidade])
-    if ok and modalidade not in MODALIDADES: msgs.append("Modalidade inválida.")
+    if ok and modalidade not in _MODALIDADES_SET: msgs.append("Modalidade inválida.")
     ok, nome = validate_text_input(nome,"Nome"); msgs += ([] if ok else [nome])
     if msgs:
         return dbc.Alert(html.Ul([html.Li(m) for m in msgs]), color="danger"), no_update
     rec = {"modalidade": modalidade, "nome": nome, "codigo": (codigo or None), "id":0}
     tid = add_exam_type(rec)
     log_action(cu.get("email"), "create", "exam_type", tid, before=None, after=rec)
-    return dbc.Alert(f"Tipo de exame adicionado (ID {tid}).", color="success", duration=3000), time.time()
+    return dbc.Alert(f"Tipo de exame adicionado (ID {tid}).", color="success", duration=3000), _refresh("examtypes")
 
 @dash.callback(
     Output("ext_edit_modal","is_open", allow_duplicate=True),
@@ -934,14 +1142,14 @@ def open_ext_edit(edit_clicks, cancel_click):
     if val in (None, 0): raise dash.exceptions.PreventUpdate
     tid = get_triggered_component_id_from_context(prop)
     if not tid: raise dash.exceptions.PreventUpdate
-    t = next((x for x in list_exam_types() if x.get("id")==tid), None)
+    t = get_exam_type(tid)
     if not t: raise dash.exceptions.PreventUpdate
     return True, tid, t.get("modalidade"), t.get("nome"), t.get("codigo")
 
 @dash.callback(
     Output("ext_edit_modal","is_open", allow_duplicate=True),
     Output("ext_feedback","children", allow_duplicate=True),
-    Output("refresh_examtypes","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("ext_edit_save","n_clicks"),
     State("edit_ext_id","data"),
     State("ext_modalidade","value"),
@@ -956,16 +1164,21 @@ def save_ext_edit(n, tid, modalidade, nome, codigo):
     if not tid: raise dash.exceptions.PreventUpdate
     msgs=[]
     ok, modalidade = validate_text_input(modalidade,"Modalidade"); msgs += ([] if ok else [modalidade])
-    if ok and modalidade not in MODALIDADES: msgs.append("Modalidade inválida.")
+    if ok and modalidade not in _MODALIDADES_SET: msgs.append("Modalidade inválida.")
     ok, nome = validate_text_input(nome,"Nome"); msgs += ([] if ok else [nome])
     if msgs:
         return True, dbc.Alert(html.Ul([html.Li(m) for m in msgs]), color="danger"), no_update
-    before = next((x for x in list_exam_types() if x.get("id")==int(tid)), None)
-    ok = update_exam_type(int(tid), {"modalidade": modalidade, "nome": nome, "codigo": (codigo or None)})
+    fields = {"modalidade": modalidade, "nome": nome, "codigo": (codigo or None)}
+    before = get_exam_type(int(tid))
+    if before is None:
+        return True, dbc.Alert("Nenhuma alteração aplicada.", color="warning"), no_update
+    if all(before.get(k) == v for k, v in fields.items()):
+        return True, dbc.Alert("Nenhuma alteração a salvar.", color="secondary", duration=3000), no_update  # modal aberto: a mensagem aparece
+    ok = update_exam_type(int(tid), fields)
     if ok:
-        after = next((x for x in list_exam_types() if x.get("id")==int(tid)), None)
+        after = {**before, **fields}
         log_action(cu.get("email"), "update", "exam_type", int(tid), before=before, after=after)
-        return False, dbc.Alert("Tipo atualizado!", color="success", duration=3000), time.time()
+        return False, dbc.Alert("Tipo atualizado!", color="success", duration=3000), _refresh("examtypes")
     return True, dbc.Alert("Nenhuma alteração aplicada.", color="warning"), no_update
 
 @dash.callback(
@@ -979,7 +1192,7 @@ def open_ext_delete(n_clicks):
     ctx = dash.callback_context
     tid = get_triggered_component_id_from_context(ctx.triggered[0]["prop_id"])
     if not tid: raise dash.exceptions.PreventUpdate
-    t = next((x for x in list_exam_types() if x.get("id")==tid), None)
+    t = get_exam_type(tid)
     if not t: raise dash.exceptions.PreventUpdate
     info = html.Div([html.P("Tem certeza que deseja excluir este tipo?"),
                      html.Ul([html.Li(f"ID: {t.get('id')}"),
@@ -990,7 +1203,7 @@ def open_ext_delete(n_clicks):
 
 @dash.callback(
     Output("ext_confirm_delete_modal","is_open", allow_duplicate=True),
-    Output("refresh_examtypes","data", allow_duplicate=True),
+    Output("refresh_tables","data", allow_duplicate=True),
     Input("ext_delete_confirm","n_clicks"),
     State("edit_ext_id","data"),
     prevent_initial_call=True
@@ -1000,11 +1213,13 @@ def confirm_ext_delete(n, tid):
     cu = current_user()
     if not cu or cu.get("perfil")!="admin" or not tid:
         return dash.no_update, no_update
-    before = next((x for x in list_exam_types() if x.get("id")==int(tid)), None)
+    before = get_exam_type(int(tid))
+    if before is None:  # já removido: só atualiza a tabela
+        return False, _refresh("examtypes")
     ok = delete_exam_type(int(tid))
     if ok:
         log_action(cu.get("email"), "delete", "exam_type", int(tid), before=before, after=None)
-    return False, time.time()
+    return False, _refresh("examtypes")
 
 @dash.callback(
     Output("ext_confirm_delete_modal","is_open", allow_duplicate=True),
@@ -1027,17 +1242,13 @@ def pick_theme_from_card(clicks, current_value):
     from dash import callback_context as ctx
     if not ctx.triggered:
         raise dash.exceptions.PreventUpdate
-    prop = ctx.triggered[0]["prop_id"]
-    try:
-        obj = json.loads(prop.split(".")[0])
-        chosen = obj.get("name") or current_value
-        return chosen, chosen
-    except Exception:
-        return current_value, current_value
+    chosen = _THEME_ID_STR_TO_NAME.get(ctx.triggered[0]["prop_id"].rsplit(".", 1)[0], current_value)
+    return chosen, chosen
 
 @dash.callback(
     Output("cfg_logo_preview","src", allow_duplicate=True),
     Output("cfg_logo_url_store","data", allow_duplicate=True),
+    Output("cfg_logo_key_store","data", allow_duplicate=True),
     Input("cfg_logo_upload","contents"),
     State("cfg_logo_upload","filename"),
     prevent_initial_call=True
@@ -1045,72 +1256,65 @@ def pick_theme_from_card(clicks, current_value):
 def handle_logo_upload(contents, filename):
     if not contents:
         raise dash.exceptions.PreventUpdate
-    url_clean, url_cache = _save_uploaded_logo_to_uploads(contents, filename)
+    url_clean, url_cache, key = _save_uploaded_logo_to_uploads(contents, filename)
     if not url_clean:
         raise dash.exceptions.PreventUpdate
-    return url_cache, url_clean  # preview com cache-buster / store com URL limpa
+    return url_cache, url_clean, key  # preview com cache-buster / store com URL limpa / hash
 
 @dash.callback(
     Output("cfg_logo_preview","src", allow_duplicate=True),
     Output("cfg_logo_url_store","data", allow_duplicate=True),
+    Output("cfg_logo_key_store","data", allow_duplicate=True),
     Input("cfg_logo_reset","n_clicks"),
     prevent_initial_call=True
 )
 def reset_logo(n):
     _ensure_button_trigger("cfg_logo_reset")
     base = f"{_assets_url_prefix()}/logo.png"
-    return f"{base}?v={int(time.time())}", base
+    return f"{base}?v=0", base, None  # logo padrão: sem chave de conteúdo, versão fixa
 
-@dash.callback(
-    Output("cfg_logo_height_num","value", allow_duplicate=True),
+# Slider <-> campo numérico <-> altura do preview: espelhamento feito no navegador
+dash.clientside_callback(
+    """
+    function(slider, num) {
+        var ctx = window.dash_clientside.callback_context;
+        var fromNum = ((ctx.triggered[0] || {}).prop_id || "").indexOf("cfg_logo_height_num.") === 0;
+        var raw = fromNum ? num : slider;
+        if (raw === null || raw === undefined || raw === "") { throw window.dash_clientside.PreventUpdate; }
+        var v = Math.max(100, Math.min(400, parseInt(raw, 10) || 100));
+        var nu = window.dash_clientside.no_update;
+        return [
+            (fromNum && v === num) ? nu : v,
+            (!fromNum && v === slider) ? nu : v,
+            {maxWidth: "100%", height: v + "px"}
+        ];
+    }
+    """,
+    Output("cfg_logo_height_num","value"),
+    Output("cfg_logo_height","value"),
+    Output("cfg_logo_preview","style"),
     Input("cfg_logo_height","value"),
-    prevent_initial_call=True
-)
-def sync_num_from_slider(v): return v
-
-@dash.callback(
-    Output("cfg_logo_height","value", allow_duplicate=True),
     Input("cfg_logo_height_num","value"),
     prevent_initial_call=True
 )
-def sync_slider_from_num(v):
-    if v is None: raise dash.exceptions.PreventUpdate
-    v = max(100, min(400, int(v)))
-    return v
 
-@dash.callback(
-    Output("cfg_logo_preview","style", allow_duplicate=True),
-    Input("cfg_logo_height","value"),
-    prevent_initial_call=True
-)
-def apply_logo_height(h):
-    return {"maxWidth":"100%", "height": f"{int(h or 100)}px"}
+# URL do CSS de cada tema resolvida uma vez (THEMES aceita str ou dict com url/href)
+_THEME_URL_CACHE = {
+    name: (v if isinstance(v, str) else ((v.get("url") or v.get("href")) if isinstance(v, dict) else None))
+    for name, v in THEMES.items()
+}
 
-@dash.callback(
-    Output("cfg_theme_iframe","srcDoc"),
-    Input("cfg_theme_store","data"),
-    Input("cfg_logo_height","value"),
-    Input("cfg_portal_name","value"),
-    Input("cfg_logo_url_store","data"),
-)
-def render_theme_iframe(theme, h, portal_name, logo_url):
-    css_url = THEMES.get(theme) if isinstance(THEMES.get(theme), str) else None
-    if not css_url and isinstance(THEMES.get(theme), dict):
-        css_url = THEMES.get(theme, {}).get("url") or THEMES.get(theme, {}).get("href")
-    portal_name = (portal_name or "").strip() or "Seu Portal"
-    h = int(h or 100)
-    logo_src = (logo_url or f"{_assets_url_prefix()}/logo.png") + f"?v={int(time.time())}"
-    head_links = f'<link rel="stylesheet" href="{css_url}">' if css_url else ""
-    doc = f"""<!doctype html>
+# Documento do preview compilado uma vez; só os campos variáveis são substituídos
+_IFRAME_TPL = Template("""<!doctype html>
 <html lang="pt-br">
 <head>
-<meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">{head_links}
-<style>body{{padding:12px}}.navbar-brand img{{height:{h}px;margin-right:.5rem}}</style>
+<meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">$head_links
+<style>body{padding:12px}.navbar-brand img{height:${h}px;margin-right:.5rem}</style>
 </head>
 <body>
 <nav class="navbar navbar-expand-lg bg-body-tertiary navbar-light">
   <div class="container-fluid">
-    <a class="navbar-brand" href="#"><img src="{logo_src}" alt="logo">{portal_name}</a>
+    <a class="navbar-brand" href="#"><img src="$logo_src" alt="logo">$portal_name</a>
     <div class="ms-auto"><a class="btn btn-primary btn-sm" href="#">Ação</a></div>
   </div>
 </nav>
@@ -1122,18 +1326,32 @@ def render_theme_iframe(theme, h, portal_name, logo_url):
     <a href="#" class="btn btn-outline-primary">Outline</a>
   </div>
 </div>
-</body></html>"""
-    return doc
+</body></html>""")
+
+@dash.callback(
+    Output("cfg_theme_iframe","srcDoc"),
+    Input("cfg_theme_store","data"),
+    Input("cfg_logo_height","value"),
+    Input("cfg_portal_name","value"),
+    Input("cfg_logo_url_store","data"),
+    Input("cfg_logo_key_store","data"),
+)
+def render_theme_iframe(theme, h, portal_name, logo_url, logo_key):
+    css_url = _THEME_URL_CACHE.get(theme)
+    logo_src = f"{logo_url or _assets_url_prefix() + '/logo.png'}?v={logo_key or '0'}"
+    return _IFRAME_TPL.substitute(
+        head_links=f'<link rel="stylesheet" href="{css_url}">' if css_url else "",
+        h=int(h or 100),
+        logo_src=logo_src,
+        portal_name=(portal_name or "").strip() or "Seu Portal",
+    )
 
 @dash.callback(
     Output("theme_css_href","data"),
     Input("cfg_theme_store","data"),
 )
 def compute_theme_href(theme):
-    url = THEMES.get(theme) if isinstance(THEMES.get(theme), str) else None
-    if not url and isinstance(THEMES.get(theme), dict):
-        url = THEMES.get(theme, {}).get("url") or THEMES.get(theme, {}).get("href")
-    return url
+    return _THEME_URL_CACHE.get(theme)
 
 @dash.callback(
     Output("cfg_feedback","children", allow_duplicate=True),
@@ -1142,9 +1360,10 @@ def compute_theme_href(theme):
     State("cfg_theme_store","data"),
     State("cfg_logo_height","value"),
     State("cfg_logo_url_store","data"),
+    State("cfg_logo_key_store","data"),
     prevent_initial_call=True
 )
-def save_cfg(n, name, theme, logo_h, logo_url_store):
+def save_cfg(n, name, theme, logo_h, logo_url_store, logo_key_store):
     _ensure_button_trigger("btn_save_cfg")
     cu = current_user()
     if not cu or cu.get("perfil")!="admin":
@@ -1154,7 +1373,8 @@ def save_cfg(n, name, theme, logo_h, logo_url_store):
         "portal_name": (name or "").strip(),
         "theme": theme,
         "logo_height_px": int(max(100, min(400, (logo_h or 100)))),
-        "logo_url": (logo_url_store or cur.get("logo_url") or f"{_assets_url_prefix()}/logo.png")
+        "logo_url": (logo_url_store or cur.get("logo_url") or f"{_assets_url_prefix()}/logo.png"),
+        "logo_cache_key": (logo_key_store if logo_url_store else cur.get("logo_cache_key")),
     }
     write_settings(new)
     log_action(cu.get("email"), "update", "settings", "theme", before=cur, after=new)
@@ -1188,54 +1408,38 @@ dash.clientside_callback(
     prevent_initial_call=True
 )
 
-# ===================== FAB: controle is_open =====================
-@dash.callback(
+# ===================== FAB: controle is_open (no navegador) =====================
+dash.clientside_callback(
+    """
+    function(openClicks, cancelClicks, result) {
+        var prop = ((window.dash_clientside.callback_context.triggered[0] || {}).prop_id || "");
+        if (prop.indexOf("fab_open.") === 0) { return true; }
+        if (prop.indexOf("fab_result.") === 0 && !(result && result.ok)) { return window.dash_clientside.no_update; }
+        return false;
+    }
+    """,
     Output("fab_modal","is_open"),
     Input("fab_open","n_clicks"),
     Input("fab_cancel","n_clicks"),
-    Input("fab_close_u","data"),
-    Input("fab_close_d","data"),
-    Input("fab_close_e","data"),
-    State("fab_modal","is_open"),
+    Input("fab_result","data"),
     prevent_initial_call=True
 )
-def toggle_fab_modal(open_clicks, cancel_clicks, close_u, close_d, close_e, is_open):
-    ctx = dash.callback_context
-    if not ctx.triggered: raise dash.exceptions.PreventUpdate
-    prop = ctx.triggered[0]["prop_id"]
-    if prop.startswith("fab_open."):
-        return True
-    return False
 
-# ===================== FAB: Salvar (gatilho único por Store) =====================
-@dash.callback(
-    Output("fab_feedback_u","children"),
-    Output("fab_close_u","data"),
-    Output("refresh_users","data", allow_duplicate=True),
-    Input("fab_save","n_clicks"),
-    State("fab_tabs","value"),
-    State("fab_u_nome","value"),
-    State("fab_u_email","value"),
-    State("fab_u_perfil","value"),
-    State("fab_u_modalidades","value"),
-    State("fab_u_senha","value"),
-    prevent_initial_call=True
-)
-def fab_save_user(n, tab_fab, nome, email, perfil, modalidades, senha):
-    _ensure_button_trigger("fab_save")
-    if tab_fab != "u":
-        raise dash.exceptions.PreventUpdate
-    cu = current_user()
-    if not cu or cu.get("perfil") != "admin":
-        return dbc.Alert("Acesso negado.", color="danger"), dash.no_update, dash.no_update
+# ===================== FAB: Salvar (um único callback, despacha pela sub-aba) =====================
+def _fab_ok():
+    # ts garante que dois salvamentos seguidos disparem o fechamento
+    return {"ok": True, "ts": time.time()}
 
+def _fab_save_user(cu, nome, email, perfil, modalidades, senha):
     msgs = []
     ok, nome = validate_text_input(nome, "Nome"); msgs += ([] if ok else [nome])
     ok, email = validate_text_input(email, "E-mail"); msgs += ([] if ok else [email])
-    if ok and not validate_email_format(email): msgs.append("Formato de e-mail inválido.")
-    elif find_user_by_email(email or ""): msgs.append("E-mail já cadastrado.")
+    if ok:
+        email = _norm_email(email)
+        if not validate_email_format(email): msgs.append("Formato de e-mail inválido.")
+        elif email in get_user_email_set(): msgs.append("E-mail já cadastrado.")
     ok, perfil = validate_text_input(perfil, "Perfil"); msgs += ([] if ok else [perfil])
-    if ok and perfil not in ["admin", "user"]: msgs.append("Perfil inválido.")
+    if ok and perfil not in _PERFIS: msgs.append("Perfil inválido.")
     ok, senha = validate_text_input(senha, "Senha"); msgs += ([] if ok else [senha])
     if ok and len((senha or "")) < 6: msgs.append("A senha deve ter pelo menos 6 caracteres.")
 
@@ -1243,10 +1447,10 @@ def fab_save_user(n, tab_fab, nome, email, perfil, modalidades, senha):
         return dbc.Alert(html.Ul([html.Li(m) for m in msgs]), color="danger"), dash.no_update, dash.no_update
 
     rec = {
-        "nome": (nome or "").strip(),
-        "email": (email or "").strip().lower(),
-        "senha_hash": generate_password_hash((senha or "").strip()),
-        "modalidades_permitidas": (modalidades or "*").strip(),
+        "nome": nome,
+        "email": email,
+        "senha_hash": _hash_password(senha),
+        "modalidades_permitidas": _norm_modalidades(modalidades),
         "perfil": perfil,
         "id": 0
     }
@@ -1254,58 +1458,23 @@ def fab_save_user(n, tab_fab, nome, email, perfil, modalidades, senha):
     log_action(cu.get("email"), "create", "user", uid, before=None,
                after={k:v for k,v in rec.items() if k != "senha_hash"})
 
-    return dbc.Alert(f"Usuário criado (ID {uid}).", color="success", duration=3000), time.time(), time.time()
-
-@dash.callback(
-    Output("fab_feedback_d","children"),
-    Output("fab_close_d","data"),
-    Output("refresh_doctors","data", allow_duplicate=True),
-    Input("fab_save","n_clicks"),
-    State("fab_tabs","value"),
-    State("fab_d_nome","value"),
-    State("fab_d_crm","value"),
-    prevent_initial_call=True
-)
-def fab_save_doctor(n, tab_fab, nome, crm):
-    _ensure_button_trigger("fab_save")
-    if tab_fab != "d":
-        raise dash.exceptions.PreventUpdate
-    cu = current_user()
-    if not cu or cu.get("perfil") != "admin":
-        return dbc.Alert("Acesso negado.", color="danger"), dash.no_update, dash.no_update
+    return dbc.Alert(f"Usuário criado (ID {uid}).", color="success", duration=3000), _fab_ok(), _refresh("users")
 
+def _fab_save_doctor(cu, nome, crm):
     ok, nome = validate_text_input(nome, "Nome")
     if not ok:
         return dbc.Alert(nome, color="danger"), dash.no_update, dash.no_update
 
-    rec = {"nome": nome, "crm": (crm or "").strip() or None, "id": 0}
+    rec = {"nome": nome, "crm": _norm_crm(crm), "id": 0}
     did = add_doctor(rec)
     log_action(cu.get("email"), "create", "doctor", did, before=None, after=rec)
 
-    return dbc.Alert(f"Médico criado (ID {did}).", color="success", duration=3000), time.time(), time.time()
-
-@dash.callback(
-    Output("fab_feedback_e","children"),
-    Output("fab_close_e","data"),
-    Output("refresh_examtypes","data", allow_duplicate=True),
-    Input("fab_save","n_clicks"),
-    State("fab_tabs","value"),
-    State("fab_e_modalidade","value"),
-    State("fab_e_nome","value"),
-    State("fab_e_codigo","value"),
-    prevent_initial_call=True
-)
-def fab_save_examtype(n, tab_fab, modalidade, nome, codigo):
-    _ensure_button_trigger("fab_save")
-    if tab_fab != "e":
-        raise dash.exceptions.PreventUpdate
-    cu = current_user()
-    if not cu or cu.get("perfil") != "admin":
-        return dbc.Alert("Acesso negado.", color="danger"), dash.no_update, dash.no_update
+    return dbc.Alert(f"Médico criado (ID {did}).", color="success", duration=3000), _fab_ok(), _refresh("doctors")
 
+def _fab_save_examtype(cu, modalidade, nome, codigo):
     msgs = []
     ok, modalidade = validate_text_input(modalidade, "Modalidade"); msgs += ([] if ok else [modalidade])
-    if ok and modalidade not in MODALIDADES: msgs.append("Modalidade inválida.")
+    if ok and modalidade not in _MODALIDADES_SET: msgs.append("Modalidade inválida.")
     ok, nome = validate_text_input(nome, "Nome"); msgs += ([] if ok else [nome])
 
     if msgs:
@@ -1315,4 +1484,40 @@ def fab_save_examtype(n, tab_fab, modalidade, nome, codigo):
     tid = add_exam_type(rec)
     log_action(cu.get("email"), "create", "exam_type", tid, before=None, after=rec)
 
-    return dbc.Alert(f"Tipo de exame adicionado (ID {tid}).", color="success", duration=3000), time.time(), time.time()
+    return dbc.Alert(f"Tipo de exame adicionado (ID {tid}).", color="success", duration=3000), _fab_ok(), _refresh("examtypes")
+
+_FAB_FEEDBACK_SLOT = {"u": 0, "d": 1, "e": 2}
+
+@dash.callback(
+    Output("fab_feedback_u","children"),
+    Output("fab_feedback_d","children"),
+    Output("fab_feedback_e","children"),
+    Output("fab_result","data"),
+    Output("refresh_tables","data", allow_duplicate=True),
+    Input("fab_save","n_clicks"),
+    State("fab_tabs","value"),
+    State("fab_u_nome","value"), State("fab_u_email","value"), State("fab_u_perfil","value"),
+    State("fab_u_modalidades","value"), State("fab_u_senha","value"),
+    State("fab_d_nome","value"), State("fab_d_crm","value"),
+    State("fab_e_modalidade","value"), State("fab_e_nome","value"), State("fab_e_codigo","value"),
+    prevent_initial_call=True
+)
+def fab_save_dispatch(n, tab_fab, u_nome, u_email, u_perfil, u_modalidades, u_senha,
+                      d_nome, d_crm, e_modalidade, e_nome, e_codigo):
+    _ensure_button_trigger("fab_save")
+    slot = _FAB_FEEDBACK_SLOT.get(tab_fab)
+    if slot is None:
+        raise dash.exceptions.PreventUpdate
+    cu = current_user()
+    if not cu or cu.get("perfil") != "admin":
+        feedback, result, refresh = dbc.Alert("Acesso negado.", color="danger"), dash.no_update, dash.no_update
+    elif tab_fab == "u":
+        feedback, result, refresh = _fab_save_user(cu, u_nome, u_email, u_perfil, u_modalidades, u_senha)
+    elif tab_fab == "d":
+        feedback, result, refresh = _fab_save_doctor(cu, d_nome, d_crm)
+    else:
+        feedback, result, refresh = _fab_save_examtype(cu, e_modalidade, e_nome, e_codigo)
+
+    out = [dash.no_update, dash.no_update, dash.no_update, result, refresh]
+    out[slot] = feedback
+    return tuple(out)
@@ -1,24 +1,17 @@
 # pages/home.py
-from datetime import datetime, date
+import threading
+import time
 
 import dash
-from dash import html, dcc, callback, Output, Input
+from dash import html, dcc, callback, Output, Input, State
 import dash_bootstrap_components as dbc
 
-from core.backend import read_settings, list_exams, compute_stock_snapshot
+from core.backend import compute_home_kpis
 
 dash.register_page(__name__, path="/", redirect_from=["/home"], name="Início", order=0)
 
 # --------------------------- Helpers ---------------------------
 
-def br_currency(x: float) -> str:
-    try:
-        v = float(x)
-    except Exception:
-        return "R$ 0,00"
-    s = f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return f"R$ {s}"
-
 def kpi_card(id_value: str, label: str, icon: str, tooltip: str | None = None):
     card = dbc.Card(
         dbc.CardBody([
@@ -71,67 +64,109 @@ def simple_card(item):
         className="text-center d-flex flex-column align-items-center justify-content-center py-4"
     )
     card = dbc.Card(card_body, className="feature-card shadow-sm h-100 text-center")
+    # caminho relativo resolvido uma vez e guardado no próprio item
+    href = item.get("href")
+    if href is None:
+        href = item["href"] = dash.get_relative_path(item["path"])
     return dcc.Link(
         card,
-        href=dash.get_relative_path(item["path"]),
+        href=href,
         className="text-decoration-none text-reset feature-item"
     )
 
+# Componentes fixos da página, montados uma única vez no import
+_CARD_COMPONENTS = tuple(simple_card(c) for c in CARDS)
+_KPI_COMPONENTS = (
+    kpi_card("kpi_total_exams", "Exames (total)", "fa-file-medical", "Total de exames cadastrados."),
+    kpi_card("kpi_today_exams", "Exames hoje", "fa-calendar-day", "Exames com data de hoje."),
+    kpi_card("kpi_low_stock", "Abaixo do mínimo", "fa-triangle-exclamation", "Materiais abaixo do mínimo."),
+    kpi_card("kpi_stock_value", "Valor do estoque", "fa-coins", "Estimativa: estoque atual × valor unitário."),
+)
+
 # --------------------------- Layout ---------------------------
 
 layout = dbc.Container([
     hero(),
 
     # KPIs (agora como DIV com GRID, centralizado e gap de 1 cm)
-    html.Div([
-        kpi_card("kpi_total_exams", "Exames (total)", "fa-file-medical", "Total de exames cadastrados."),
-        kpi_card("kpi_today_exams", "Exames hoje", "fa-calendar-day", "Exames com data de hoje."),
-        kpi_card("kpi_low_stock", "Abaixo do mínimo", "fa-triangle-exclamation", "Materiais abaixo do mínimo."),
-        kpi_card("kpi_stock_value", "Valor do estoque", "fa-coins", "Estimativa: estoque atual × valor unitário."),
-    ], className="kpi-grid mb-4"),
+    html.Div(list(_KPI_COMPONENTS), className="kpi-grid mb-4"),
 
     html.H5("Acessos rápidos", className="mt-2 mb-3 text-center"),
 
     # GRID com 3 colunas e gap de 1 cm (funções)
-    html.Div([simple_card(c) for c in CARDS], className="features-grid mb-5"),
+    html.Div(list(_CARD_COMPONENTS), className="features-grid mb-5"),
 
-    dcc.Interval(id="home_refresh", interval=60_000, n_intervals=0)
+    dcc.Interval(id="home_refresh", interval=60_000, n_intervals=0),
+    dcc.Store(id="home_tick"),  # ticks do intervalo que chegam ao servidor (só com a aba visível)
+    dcc.Store(id="home_kpi_store"),  # KPIs crus; a formatação é feita no navegador
 ], fluid=True)
 
 # --------------------------- Callbacks ---------------------------
 
+# KPIs compartilhados entre clientes/abas: recalculados no máximo a cada _KPI_TTL segundos
+# (o intervalo da página é de 60 s, então cada tick encontra no máximo um recálculo)
+_KPI_TTL = 55.0
+_KPI_CACHE = {"t": 0.0, "val": None}
+_KPI_LOCK = threading.Lock()
+
+def _warm_kpi_kernels():
+    # compila (ou carrega do cache) o kernel numba dos KPIs fora do caminho da requisição
+    try:
+        import core.kernels  # noqa: F401
+    except Exception:
+        pass  # sem numpy/numba aqui: o 1º cálculo dos KPIs paga o import
+
+threading.Thread(target=_warm_kpi_kernels, name="kpi-kernels-warmup", daemon=True).start()
+
+def _cached_kpis():
+    if _KPI_CACHE["val"] is not None and time.monotonic() - _KPI_CACHE["t"] < _KPI_TTL:
+        return _KPI_CACHE["val"]
+    with _KPI_LOCK:  # só uma thread recalcula; as demais esperam e reaproveitam
+        if _KPI_CACHE["val"] is None or time.monotonic() - _KPI_CACHE["t"] >= _KPI_TTL:
+            _KPI_CACHE["val"] = compute_home_kpis()
+            _KPI_CACHE["t"] = time.monotonic()
+        return _KPI_CACHE["val"]
+
+# Aba oculta não consulta o servidor: o tick só passa adiante com a página visível
+# (ao voltar, o próximo tick já atualiza os KPIs)
+dash.clientside_callback(
+    """
+    function(n) {
+        if (document.hidden) { return window.dash_clientside.no_update; }
+        return n;
+    }
+    """,
+    Output("home_tick", "data"),
+    Input("home_refresh", "n_intervals"),
+)
+
 @callback(
+    Output("home_kpi_store", "data"),
+    Input("home_tick", "data"),
+    State("home_kpi_store", "data"),
+    prevent_initial_call=True,  # a 1ª carga vem do tick inicial (n_intervals=0)
+)
+def load_kpis(_n, current):
+    total, today_count, low, stock_value = _cached_kpis()
+    kpis = {"total": total, "today": today_count, "low": low, "value": stock_value}
+    if kpis == current:
+        # nada mudou para este cliente: não envia payload nem re-renderiza os cards
+        raise dash.exceptions.PreventUpdate
+    return kpis
+
+# Distribui os KPIs para os cards; moeda em pt-BR via Intl (formatador criado uma vez por página)
+dash.clientside_callback(
+    """
+    function(k) {
+        if (!k) { throw window.dash_clientside.PreventUpdate; }
+        var brl = window._homeBRL || (window._homeBRL = new Intl.NumberFormat("pt-BR", {style: "currency", currency: "BRL"}));
+        var v = Number(k.value);
+        return [String(k.total), String(k.today), String(k.low), brl.format(isFinite(v) ? v : 0)];
+    }
+    """,
     Output("kpi_total_exams", "children"),
     Output("kpi_today_exams", "children"),
     Output("kpi_low_stock", "children"),
     Output("kpi_stock_value", "children"),
-    Input("home_refresh", "n_intervals"),
+    Input("home_kpi_store", "data"),
 )
-def load_kpis(_n):
-    rows = list_exams()
-    total = len(rows)
-
-    today = date.today()
-    today_count = 0
-    for e in rows:
-        dt_iso = e.get("data_hora")
-        if not dt_iso:
-            continue
-        try:
-            dt = datetime.fromisoformat(dt_iso)
-            if dt.date() == today:
-                today_count += 1
-        except Exception:
-            pass
-
-    snap = compute_stock_snapshot()
-    low = sum(1 for r in snap if r.get("abaixo_minimo"))
-    stock_value = 0.0
-    for r in snap:
-        try:
-            stock_value += float(r.get("estoque_atual") or 0.0) * float(r.get("valor_unitario") or 0.0)
-        except Exception:
-            pass
-
-    return f"{total}", f"{today_count}", f"{low}", br_currency(stock_value)
-
@@ -0,0 +1,30 @@
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# backend resolve os caminhos (DATA_DIR) e cria os arquivos na importação
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="am_radiologia_test_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import backend  # noqa: E402
+
+
+def _write_exams(exams):
+    with open(backend.EXAMS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"exams": exams}, f)
+
+
+def test_home_kpis_tolerate_non_string_data_hora():
+    hoje = datetime.now().replace(microsecond=0).isoformat()
+    _write_exams([
+        {"id": 1, "data_hora": hoje},
+        {"id": 2, "data_hora": 1700000000},      # epoch legado (int)
+        {"id": 3, "data_hora": 1700000000.5},    # epoch legado (float)
+        {"id": 4, "data_hora": None},
+        {"id": 5, "data_hora": "lixo"},
+    ])
+    total, today_count, _low, _value = backend.compute_home_kpis()
+    assert total == 5
+    assert today_count == 1